@@ -24,6 +24,23 @@ def create_app(config_name=None):
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
     
+    # Set up OCR capability probing, zone templates, the result and duplicate
+    # page caches, admission control, upload cleanup and background job queue
+    from app.capabilities import init_capabilities
+    from app.zones import init_templates
+    from app.cache import init_cache
+    from app.dedup import init_page_cache
+    from app.admission import init_admission
+    from app.janitor import init_janitor
+    from app.jobs import init_jobs
+    init_capabilities(app)
+    init_templates(app)
+    init_cache(app)
+    init_page_cache(app)
+    init_admission(app)
+    init_janitor(app)
+    init_jobs(app)
+    
     # Configure logging
     if not app.debug and not app.testing:
         if not os.path.exists('logs'):
@@ -0,0 +1,215 @@
+"""
+Admission control for OCR work.
+
+Each worker process admits OCR requests against a budget of concurrent
+requests and concurrent pages, so one large PDF counts for more than a
+single photo. Requests that do not fit wait in a bounded FIFO queue for up
+to ADMISSION_WAIT_TIMEOUT seconds and are then turned away with 503. Each
+client is also rate limited with a token bucket sized from UPLOAD_RATE_LIMIT.
+"""
+
+import re
+import math
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+RATE_PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 60 * 60,
+    'day': 24 * 60 * 60
+}
+
+class AdmissionError(Exception):
+    """OCR work was not admitted; carries the HTTP status and Retry-After seconds."""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+def parse_rate_limit(rate):
+    """Parse a rate string such as '10 per minute' or '100/hour' into (count, seconds).
+
+    Returns:
+        tuple: (count, period in seconds), or None if rate is empty
+    """
+    if not rate:
+        return None
+    match = re.fullmatch(r'\s*(\d+)\s*(?:per|/)\s*(\d*)\s*(second|minute|hour|day)s?\s*', rate.lower())
+    if not match:
+        raise ValueError(f'Invalid rate limit: {rate!r}')
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * RATE_PERIODS[unit]
+
+class RateLimiter:
+    """Per-client token buckets allowing `count` requests per `period` seconds."""
+
+    def __init__(self, count, period):
+        self.capacity = count
+        self.refill_rate = count / period  # Tokens per second
+        self._buckets = {}  # client -> (tokens, last update)
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def acquire(self, client):
+        """Take one token for client.
+
+        Returns:
+            float: 0 if allowed, otherwise seconds until a token is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+            if tokens >= 1:
+                self._buckets[client] = (tokens - 1, now)
+                retry_after = 0.0
+            else:
+                self._buckets[client] = (tokens, now)
+                retry_after = (1 - tokens) / self.refill_rate
+
+            self._prune(now)
+        return retry_after
+
+    def _prune(self, now):
+        """Forget clients whose buckets have refilled completely."""
+        full_after = self.capacity / self.refill_rate
+        if now - self._last_prune < full_after:
+            return
+        self._buckets = {
+            client: state for client, state in self._buckets.items()
+            if now - state[1] < full_after
+        }
+        self._last_prune = now
+
+class AdmissionController:
+    """Weighted, FIFO admission of OCR work across the threads of one process."""
+
+    def __init__(self, max_requests, max_pages, max_waiting, wait_timeout, retry_after):
+        self.max_requests = max_requests
+        self.max_pages = max_pages
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self.requests_in_flight = 0
+        self.pages_in_flight = 0
+        self._waiters = deque()
+        self._cond = threading.Condition()
+
+    def _fits(self, pages):
+        return (self.requests_in_flight < self.max_requests
+                and self.pages_in_flight + pages <= self.max_pages)
+
+    def acquire(self, pages, background=False):
+        """
+        Wait for capacity for `pages` pages of OCR.
+
+        Documents larger than the whole page budget are admitted on their
+        own once everything else has drained.
+
+        Args:
+            pages (int): Estimated pages the work will OCR
+            background (bool): Work already accepted elsewhere, such as queued
+                jobs, waits without a timeout and outside the wait-queue limit
+
+        Returns:
+            int: Weight to pass to release()
+
+        Raises:
+            AdmissionError: When the wait queue is full or the wait times out
+        """
+        weight = min(max(1, pages), self.max_pages)
+
+        with self._cond:
+            if not self._waiters and self._fits(weight):
+                self._admit(weight)
+                return weight
+
+            if not background and len(self._waiters) >= self.max_waiting:
+                raise AdmissionError('Server is busy. Please try again shortly.', 503, self.retry_after)
+
+            ticket = object()
+            self._waiters.append(ticket)
+            deadline = None if background else time.monotonic() + self.wait_timeout
+            try:
+                while not (self._waiters[0] is ticket and self._fits(weight)):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise AdmissionError('Server is busy. Please try again shortly.', 503, self.retry_after)
+                    self._cond.wait(remaining)
+                self._admit(weight)
+            finally:
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+        return weight
+
+    def _admit(self, weight):
+        self.requests_in_flight += 1
+        self.pages_in_flight += weight
+
+    def release(self, weight):
+        """Return capacity taken by acquire()."""
+        with self._cond:
+            self.requests_in_flight -= 1
+            self.pages_in_flight -= weight
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, pages, background=False):
+        """Hold capacity for `pages` pages for the duration of the block."""
+        weight = self.acquire(pages, background)
+        try:
+            yield
+        finally:
+            self.release(weight)
+
+    def stats(self):
+        """Return current admission state."""
+        with self._cond:
+            return {
+                'requests_in_flight': self.requests_in_flight,
+                'pages_in_flight': self.pages_in_flight,
+                'waiting': len(self._waiters)
+            }
+
+def init_admission(app):
+    """Create the admission controller and upload rate limiter for the app."""
+    controller = AdmissionController(
+        max_requests=max(1, int(app.config.get('MAX_CONCURRENT_UPLOADS') or 1)),
+        max_pages=max(1, int(app.config.get('MAX_CONCURRENT_PAGES') or 1)),
+        max_waiting=max(0, int(app.config.get('ADMISSION_QUEUE_DEPTH') or 0)),
+        wait_timeout=app.config.get('ADMISSION_WAIT_TIMEOUT', 10),
+        retry_after=max(1, math.ceil(app.config.get('ADMISSION_RETRY_AFTER', 5)))
+    )
+    app.extensions['ocr_admission'] = controller
+
+    rate = parse_rate_limit(app.config.get('UPLOAD_RATE_LIMIT'))
+    app.extensions['ocr_rate_limiter'] = RateLimiter(*rate) if rate else None
+    if rate:
+        logger.info(f"Upload rate limit: {rate[0]} request(s) per {rate[1]} seconds per client")
+    return controller
+
+def get_admission():
+    """Get the admission controller for the current app."""
+    return current_app.extensions['ocr_admission']
+
+def check_rate_limit(client):
+    """Take one upload from client's allowance.
+
+    Raises:
+        AdmissionError: With status 429 when the client is over its rate limit
+    """
+    limiter = current_app.extensions.get('ocr_rate_limiter')
+    if limiter is None:
+        return
+    retry_after = limiter.acquire(client)
+    if retry_after:
+        raise AdmissionError('Too many uploads. Please slow down.', 429, max(1, math.ceil(retry_after)))
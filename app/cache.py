@@ -0,0 +1,241 @@
+"""
+OCR result cache keyed by uploaded file content, language and Tesseract settings.
+
+Two backends are available: an in-process LRU bounded by the size of the
+cached results, and an on-disk store that every worker process on the host
+can share.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+def hash_stream(stream, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file-like object and rewind it."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def make_cache_key(file_hash, language, signature):
+    """Combine the file hash with everything else that affects OCR output."""
+    key_input = f"{file_hash}|{language}|{signature}".encode('utf-8')
+    return hashlib.sha256(key_input).hexdigest()
+
+def _entry_size(value):
+    """Approximate size of a cached result in bytes."""
+    return len(json.dumps(value).encode('utf-8'))
+
+class MemoryCache:
+    """In-process LRU cache with TTL and size-based eviction."""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, size, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self._size -= size
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting least recently used entries to fit."""
+        size = _entry_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+
+            self._entries[key] = (time.time() + self.ttl, size, value)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Return cache statistics."""
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+class DiskCache:
+    """File-backed cache shared across worker processes.
+
+    Each entry is a JSON file named by its key. Writes go through a temporary
+    file and os.replace so concurrent readers never see partial entries.
+    Reads refresh the file's mtime, which is used as the LRU order when the
+    directory grows past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes, ttl):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._size = self._scan_size()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _scan_size(self):
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.json'):
+                total += entry.stat().st_size
+        return total
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if stat.st_mtime + self.ttl < time.time():
+                os.remove(path)
+                with self._lock:
+                    self._size -= stat.st_size
+                self.misses += 1
+                return None
+
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)  # Mark as recently used
+            self.hits += 1
+            return value
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Store a value atomically, evicting old entries if over budget."""
+        data = json.dumps(value).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        try:
+            previous_size = os.path.getsize(path)  # Replacing an entry frees its old size
+        except OSError:
+            previous_size = 0
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry: {str(e)}")
+            return
+
+        with self._lock:
+            self._size += len(data) - previous_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete expired and least recently used entries until under budget."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        # Other workers write here too, so re-derive the size from disk
+        self._size = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.ttl
+        target = self.max_bytes * 0.9
+
+        for mtime, size, path in sorted(entries):
+            if self._size <= target and mtime >= cutoff:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                continue
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith('.json'):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        continue
+            self._size = 0
+
+    def stats(self):
+        """Return cache statistics for this worker."""
+        return {
+            'backend': 'disk',
+            'bytes': self._size,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+def init_cache(app):
+    """Create the configured result cache and attach it to the app."""
+    backend = (app.config.get('OCR_CACHE_BACKEND') or 'none').lower()
+    max_bytes = app.config.get('OCR_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+    ttl = app.config.get('OCR_CACHE_TTL', 24 * 60 * 60)
+
+    if backend == 'memory':
+        cache = MemoryCache(max_bytes, ttl)
+    elif backend == 'disk':
+        cache = DiskCache(app.config['OCR_CACHE_DIR'], max_bytes, ttl)
+    else:
+        cache = None
+
+    app.extensions['ocr_cache'] = cache
+    return cache
+
+def get_cache():
+    """Get the result cache for the current app, or None if disabled."""
+    return current_app.extensions.get('ocr_cache')
@@ -0,0 +1,143 @@
+"""
+Process-wide registry of OCR capabilities.
+
+Probing Tesseract and Poppler means running subprocesses, so the results
+(engine, Tesseract version, installed languages, Poppler version) are
+collected once per process, either at app start or on first use, and
+refreshed lazily after CAPABILITY_TTL seconds.
+"""
+
+import re
+import time
+import hashlib
+import logging
+import os
+import subprocess
+import threading
+from flask import current_app
+from app import engines
+
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Languages advertised in demonstration mode when Tesseract is missing
+MOCK_LANGUAGES = ['eng', 'spa', 'fra', 'deu']
+
+class CapabilityRegistry:
+    """Caches the result of probing the OCR toolchain."""
+
+    def __init__(self, config):
+        self.tesseract_cmd = config.get('TESSERACT_CMD')
+        self.poppler_path = config.get('POPPLER_PATH')
+        self.engine_name = config.get('OCR_ENGINE', 'pytesseract')
+        self.ttl = config.get('CAPABILITY_TTL', 0)
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the capability snapshot, probing if missing or stale."""
+        snapshot = self._snapshot
+        if snapshot is None or (self.ttl and time.time() - snapshot['probed_at'] > self.ttl):
+            with self._lock:
+                # Another thread may have refreshed while we waited
+                if self._snapshot is snapshot:
+                    self._snapshot = self._probe()
+                snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self):
+        """Probe again immediately."""
+        with self._lock:
+            self._snapshot = self._probe()
+        return self._snapshot
+
+    def _probe(self):
+        engine_name, tesseract_version = self._probe_tesseract()
+        tesseract_ok = tesseract_version is not None
+        languages = self._probe_languages(engine_name) if tesseract_ok else list(MOCK_LANGUAGES)
+        poppler_version = self._probe_poppler()
+
+        snapshot = {
+            'engine': engine_name if tesseract_ok else 'mock',
+            'tesseract': {
+                'available': tesseract_ok,
+                'version': tesseract_version
+            },
+            'languages': languages,
+            'languages_etag': hashlib.sha1(','.join(languages).encode('utf-8')).hexdigest(),
+            'poppler': {
+                'available': poppler_version is not None,
+                'version': poppler_version
+            },
+            'probed_at': time.time()
+        }
+        logger.info(
+            f"OCR capabilities: engine={snapshot['engine']}, tesseract={tesseract_version}, "
+            f"languages={len(languages)}, poppler={poppler_version}"
+        )
+        return snapshot
+
+    def _probe_tesseract(self):
+        """Configure Tesseract and return (engine name, version or None)."""
+        if not TESSERACT_AVAILABLE:
+            return 'pytesseract', None
+
+        # Configure Tesseract path
+        if self.tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+            logger.info(f"Tesseract path configured: {self.tesseract_cmd}")
+
+        if self.engine_name == 'tesserocr':
+            if engines.TESSEROCR_AVAILABLE:
+                return 'tesserocr', str(engines.tesserocr.tesseract_version()).splitlines()[0]
+            logger.warning("tesserocr is not installed; falling back to pytesseract")
+
+        try:
+            return 'pytesseract', str(pytesseract.get_tesseract_version())
+        except Exception as e:
+            logger.warning(f"Tesseract not available: {e}")
+            return 'pytesseract', None
+
+    def _probe_languages(self, engine_name):
+        try:
+            if engine_name == 'tesserocr':
+                _, languages = engines.tesserocr.get_languages()
+            else:
+                languages = pytesseract.get_languages()
+            return sorted(lang for lang in languages if lang != 'osd')
+        except Exception as e:
+            logger.error(f"Error getting available languages: {str(e)}")
+            return ['eng']  # Default fallback
+
+    def _probe_poppler(self):
+        """Return the Poppler version, or None if pdftoppm cannot be run."""
+        if not TESSERACT_AVAILABLE:
+            return None
+
+        command = os.path.join(self.poppler_path, 'pdftoppm') if self.poppler_path else 'pdftoppm'
+        try:
+            completed = subprocess.run([command, '-v'], capture_output=True, timeout=10)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Poppler not available: {e}")
+            return None
+
+        output = (completed.stderr + completed.stdout).decode('utf-8', errors='replace')
+        match = re.search(r'version\s+([\d.]+)', output)
+        return match.group(1) if match else 'unknown'
+
+def init_capabilities(app):
+    """Create the capability registry and optionally probe at startup."""
+    registry = CapabilityRegistry(app.config)
+    app.extensions['ocr_capabilities'] = registry
+    if app.config.get('CAPABILITY_PROBE_AT_STARTUP', True):
+        registry.get()
+    return registry
+
+def get_capabilities():
+    """Get the current capability snapshot."""
+    return current_app.extensions['ocr_capabilities'].get()
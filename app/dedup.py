@@ -0,0 +1,111 @@
+"""
+Duplicate page detection.
+
+Scanned batches repeat pages: cover sheets, identical terms and conditions,
+rescans. Each rasterized page is reduced to a difference hash (dHash): the
+page is box-filtered down to a (size + 1) x size grayscale thumbnail in one
+Pillow pass, and each bit records whether a cell is brighter than its right
+neighbour. Pages whose hashes differ in at most `distance` bits reuse the
+OCR output of the earlier page, across requests, from an in-process LRU.
+"""
+
+import threading
+from collections import OrderedDict
+from PIL import Image
+from flask import current_app
+
+def dhash(image, size=16):
+    """Difference hash of an image as an int of size * size bits."""
+    if image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')  # Palette and bilevel images only resize with NEAREST
+    pixels = list(image.resize((size + 1, size), Image.Resampling.BOX).convert('L').getdata())
+
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(offset, offset + size):
+            value = (value << 1) | (pixels[col] > pixels[col + 1])
+    return value
+
+def hamming(a, b):
+    """Number of bits that differ between two hashes."""
+    return bin(a ^ b).count('1')
+
+class PageCache:
+    """In-process LRU of page hash -> OCR output, with near-duplicate lookup.
+
+    Entries are keyed by a signature of everything else that affects the
+    output (language, Tesseract config, engine, preprocessing), so a page
+    only matches pages OCR'd the same way.
+    """
+
+    def __init__(self, max_entries, distance=0, hash_size=16):
+        self.max_entries = max_entries
+        self.distance = distance
+        self.hash_size = hash_size
+        self._entries = OrderedDict()  # (signature, page_hash) -> value
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def get(self, signature, page_hash):
+        """Return the value stored for the same or a near-identical page, or None."""
+        with self._lock:
+            key = (signature, page_hash)
+            if key in self._entries:
+                self.hits += 1
+            else:
+                # Linear scan, most recent first; hashes are ints, so thousands of entries take about a millisecond
+                key = next((
+                    candidate for candidate in reversed(self._entries)
+                    if candidate[0] == signature and hamming(candidate[1], page_hash) <= self.distance
+                ), None) if self.distance else None
+                if key is None:
+                    self.misses += 1
+                    return None
+                self.near_hits += 1
+
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, signature, page_hash, value):
+        """Store a page's value, evicting the least recently used pages past max_entries."""
+        with self._lock:
+            self._entries[(signature, page_hash)] = value
+            self._entries.move_to_end((signature, page_hash))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return page cache statistics."""
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.near_hits) / lookups if lookups else 0.0
+            }
+
+def init_page_cache(app):
+    """Create the duplicate page cache when OCR_PAGE_DEDUP is on and attach it to the app."""
+    cache = None
+    if app.config.get('OCR_PAGE_DEDUP', False):
+        cache = PageCache(
+            max(1, int(app.config.get('OCR_PAGE_DEDUP_MAX_ENTRIES') or 1000)),
+            max(0, int(app.config.get('OCR_PAGE_DEDUP_DISTANCE') or 0)),
+            max(2, int(app.config.get('OCR_PAGE_DEDUP_HASH_SIZE') or 16))
+        )
+    app.extensions['ocr_page_cache'] = cache
+    return cache
+
+def get_page_cache():
+    """Get the duplicate page cache for the current app, or None if disabled."""
+    return current_app.extensions.get('ocr_page_cache')
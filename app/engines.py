@@ -0,0 +1,259 @@
+"""
+OCR engine backends.
+
+The default engine runs the tesseract binary through pytesseract, which
+starts a new process (and reloads traineddata) for every call. When the
+optional tesserocr package is installed, the tesserocr engine keeps warm
+libtesseract instances in-process instead.
+"""
+
+import re
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Tesseract's defaults when --oem / --psm are not given on the command line
+DEFAULT_OEM = 3
+DEFAULT_PSM = 3
+
+# Page segmentation mode that only detects orientation and script
+OSD_PSM = 0
+
+def parse_tesseract_config(config):
+    """Split a tesseract CLI config string into (oem, psm, variables)."""
+    oem_match = re.search(r'--oem\s+(\d+)', config or '')
+    psm_match = re.search(r'--psm\s+(\d+)', config or '')
+    variables = dict(re.findall(r'-c\s+(\w+)=(\S+)', config or ''))
+
+    oem = int(oem_match.group(1)) if oem_match else DEFAULT_OEM
+    psm = int(psm_match.group(1)) if psm_match else DEFAULT_PSM
+    return oem, psm, variables
+
+def _with_dpi(image, config):
+    """Pass the image's DPI, if known, on the command line.
+
+    pytesseract hands the CLI a PNG without a resolution, so otherwise
+    Tesseract would estimate one even where tesserocr is given the real DPI.
+    Only rasterized PDF pages carry a DPI; the metadata of uploaded images is
+    dropped when they are decoded, so Tesseract keeps estimating theirs.
+    """
+    dpi = image.info.get('dpi', (0, 0))[0]
+    return f'{config} --dpi {int(dpi)}' if dpi else config
+
+@contextmanager
+def _kill_on_timeout(timeout):
+    """Turn pytesseract's timeout, which kills the tesseract process, into TimeoutError."""
+    try:
+        yield
+    except RuntimeError as e:
+        if str(e) == 'Tesseract process timeout':
+            raise TimeoutError(f'Tesseract did not finish within {timeout:g} seconds') from e
+        raise
+
+class PytesseractEngine:
+    """Runs the tesseract binary once per call.
+
+    A timeout (seconds, 0 for none) kills the tesseract process and raises
+    TimeoutError.
+    """
+
+    name = 'pytesseract'
+
+    def image_to_string(self, image, language, config, timeout=0):
+        with _kill_on_timeout(timeout):
+            return pytesseract.image_to_string(image, lang=language, config=_with_dpi(image, config), timeout=timeout)
+
+    def image_to_data(self, image, language, config, timeout=0):
+        with _kill_on_timeout(timeout):
+            return pytesseract.image_to_data(image, lang=language, config=_with_dpi(image, config),
+                                             output_type=pytesseract.Output.DICT, timeout=timeout)
+
+    def detect_orientation_script(self, image, timeout=0):
+        """Return (clockwise degrees that make the page upright, script name) from an OSD pass."""
+        with _kill_on_timeout(timeout):
+            osd = pytesseract.image_to_osd(image, config=_with_dpi(image, f'--psm {OSD_PSM}'),
+                                           output_type=pytesseract.Output.DICT, timeout=timeout)
+        return int(osd['rotate']), osd['script']
+
+    def image_to_string_and_pdf(self, image, language, config, pdf_path, timeout=0):
+        """OCR once with Tesseract's text and PDF renderers, moving the searchable page PDF to pdf_path."""
+        config = _with_dpi(image, config)  # Also sets the PDF page size
+        with pytesseract.pytesseract.save(image) as (temp_name, input_filename), _kill_on_timeout(timeout):
+            # run_tesseract passes one extension as one argument; the config goes just before it,
+            # so a trailing 'txt' there makes the renderer arguments 'txt pdf'
+            pytesseract.pytesseract.run_tesseract(input_filename, temp_name, 'pdf', language, f'{config} txt',
+                                                  timeout=timeout)
+            shutil.move(f'{temp_name}.pdf', pdf_path)
+            with open(f'{temp_name}.txt', encoding='utf-8') as f:
+                return f.read()
+
+class TesserocrEngine:
+    """Keeps warm libtesseract instances, one per thread, language and mode.
+
+    TessBaseAPI is not thread-safe, so each worker thread gets its own
+    instances. They are initialised on first use and reused for every later
+    page, avoiding the process start and traineddata load of the CLI.
+
+    There is no process to kill, so a timeout (seconds, 0 for none) is
+    handed to libtesseract's recognition deadline, which abandons the page
+    and raises TimeoutError.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, tessdata_path=None):
+        self.tessdata_path = tessdata_path
+        self._local = threading.local()
+
+    def _get_api(self, language, oem, psm):
+        apis = getattr(self._local, 'apis', None)
+        if apis is None:
+            apis = self._local.apis = {}
+
+        key = (language, oem, psm)
+        api = apis.get(key)
+        if api is None:
+            kwargs = {'lang': language, 'oem': oem, 'psm': psm}
+            if self.tessdata_path:
+                kwargs['path'] = self.tessdata_path
+            api = apis[key] = tesserocr.PyTessBaseAPI(**kwargs)
+            logger.info(f"Initialised tesserocr engine for '{language}' in {threading.current_thread().name}")
+        return api
+
+    def _set_image(self, api, image, config):
+        """Apply config variables and load an image into an API instance.
+
+        Returns:
+            dict: The variables' previous values, for _reset_variables
+        """
+        previous = {}
+        for name, value in parse_tesseract_config(config)[2].items():
+            previous[name] = api.GetVariableAsString(name)
+            api.SetVariable(name, value)
+
+        # Same resolution as PytesseractEngine passes with --dpi; without one, both let Tesseract estimate it
+        dpi = image.info.get('dpi', (0, 0))[0]
+        api.SetImage(image)
+        if dpi:
+            api.SetSourceResolution(int(dpi))
+        return previous
+
+    def _reset_variables(self, api, previous):
+        """Restore variables changed by _set_image.
+
+        Instances are shared by every call with the same language and mode,
+        and Clear() keeps variables, so e.g. a zone's whitelist would
+        otherwise apply to every later page on this thread.
+        """
+        for name, value in previous.items():
+            api.SetVariable(name, value if value is not None else '')
+
+    def _recognize(self, api, timeout):
+        """Run recognition with libtesseract's deadline, in milliseconds."""
+        if not api.Recognize(int(timeout * 1000)):
+            if timeout:
+                raise TimeoutError(f'Tesseract did not finish within {timeout:g} seconds')
+            raise RuntimeError('Tesseract recognition failed')
+
+    def image_to_string(self, image, language, config, timeout=0):
+        oem, psm, _ = parse_tesseract_config(config)
+        api = self._get_api(language, oem, psm)
+
+        previous = {}
+        try:
+            previous = self._set_image(api, image, config)
+            self._recognize(api, timeout)
+
+            # The CLI's text renderer ends each page with a form feed
+            return api.GetUTF8Text() + '\f'
+        finally:
+            api.Clear()
+            self._reset_variables(api, previous)
+
+    def image_to_data(self, image, language, config, timeout=0):
+        """Word rows in the same shape as pytesseract's image_to_data dict."""
+        oem, psm, _ = parse_tesseract_config(config)
+        api = self._get_api(language, oem, psm)
+        RIL = tesserocr.RIL
+
+        columns = ('level', 'block_num', 'par_num', 'line_num', 'word_num',
+                   'left', 'top', 'width', 'height', 'conf', 'text')
+        data = {column: [] for column in columns}
+        previous = {}
+        try:
+            previous = self._set_image(api, image, config)
+            self._recognize(api, timeout)
+
+            block = par = line = word = 0
+            iterator = api.GetIterator()
+            for result in tesserocr.iterate_level(iterator, RIL.WORD):
+                if result.IsAtBeginningOf(RIL.BLOCK):
+                    block, par, line = block + 1, 0, 0
+                if result.IsAtBeginningOf(RIL.PARA):
+                    par, line = par + 1, 0
+                if result.IsAtBeginningOf(RIL.TEXTLINE):
+                    line, word = line + 1, 0
+                word += 1
+
+                box = result.BoundingBox(RIL.WORD)
+                if box is None:
+                    continue
+                left, top, right, bottom = box
+                row = (5, block, par, line, word, left, top, right - left, bottom - top,
+                       result.Confidence(RIL.WORD), result.GetUTF8Text(RIL.WORD))
+                for column, value in zip(columns, row):
+                    data[column].append(value)
+            return data
+        finally:
+            api.Clear()
+            self._reset_variables(api, previous)
+
+    def detect_orientation_script(self, image, timeout=0):
+        """Return (clockwise degrees that make the page upright, script name) from an OSD pass.
+
+        OSD on a downscaled page is short and has no deadline in libtesseract, so timeout is unused.
+        """
+        api = self._get_api('osd', DEFAULT_OEM, OSD_PSM)
+        try:
+            self._set_image(api, image, '')
+            osd = api.DetectOrientationScript()
+            if not osd:
+                raise RuntimeError('Orientation and script detection found too little text')
+            # orient_deg is counter-clockwise; the CLI's 'Rotate' is its clockwise complement
+            return (360 - osd['orient_deg']) % 360, osd['script_name']
+        finally:
+            api.Clear()
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(name='pytesseract', tessdata_path=None):
+    """Get the engine for this process, falling back to pytesseract."""
+    if name == 'tesserocr' and not TESSEROCR_AVAILABLE:
+        name = 'pytesseract'
+
+    engine = _engines.get(name)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(name)
+            if engine is None:
+                if name == 'tesserocr':
+                    engine = TesserocrEngine(tessdata_path)
+                else:
+                    engine = PytesseractEngine()
+                _engines[name] = engine
+    return engine
@@ -0,0 +1,122 @@
+"""
+Background removal of expired uploads.
+
+Files spooled to UPLOAD_FOLDER are registered with an expiry deadline in an
+in-memory heap, so expiring them never needs a directory scan. The upload
+folder is scanned once, when the janitor thread starts, to pick up files
+orphaned by a crash or by another worker process.
+"""
+
+import os
+import time
+import heapq
+import logging
+import threading
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+class Janitor:
+    """Deletes tracked files after their retention period on a background thread."""
+
+    def __init__(self, upload_folder, retention_seconds, interval):
+        self.upload_folder = upload_folder
+        self.retention_seconds = retention_seconds
+        self.interval = interval
+        self._expiry = []  # Heap of (deadline, path)
+        self._tasks = []  # Extra callables run on every pass
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def track(self, path, created_at=None):
+        """Schedule a file for deletion once its retention period has passed."""
+        deadline = (created_at or time.time()) + self.retention_seconds
+        with self._lock:
+            heapq.heappush(self._expiry, (deadline, path))
+
+    def add_task(self, func):
+        """Run func() on every janitor pass, e.g. to purge other expired state."""
+        self._tasks.append(func)
+
+    def sweep(self):
+        """Scan the upload folder once and track every file found in it."""
+        try:
+            with os.scandir(self.upload_folder) as entries:
+                count = 0
+                for entry in entries:
+                    if entry.is_file():
+                        self.track(entry.path, entry.stat().st_ctime)
+                        count += 1
+            logger.info(f"Janitor tracking {count} existing file(s) in {self.upload_folder}")
+        except OSError as e:
+            logger.error(f"Upload folder sweep error: {str(e)}")
+
+    def remove_expired(self, now=None):
+        """Delete every tracked file whose deadline has passed.
+
+        Returns:
+            int: Number of files removed
+        """
+        now = now or time.time()
+        removed = 0
+        while True:
+            with self._lock:
+                if not self._expiry or self._expiry[0][0] > now:
+                    break
+                _, path = heapq.heappop(self._expiry)
+            try:
+                os.remove(path)
+                removed += 1
+                logger.info(f"Cleaned up old file: {os.path.basename(path)}")
+            except FileNotFoundError:
+                pass  # Already processed and discarded, or removed by another worker
+            except OSError as e:
+                logger.error(f"File cleanup error: {str(e)}")
+        return removed
+
+    def run_once(self):
+        """One janitor pass: expire files, then run extra tasks."""
+        self.remove_expired()
+        for task in self._tasks:
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"Janitor task error: {str(e)}")
+
+    def start(self):
+        """Start the background thread, which sweeps once and then runs every interval."""
+        if self._thread is not None or not self.interval:
+            return
+        self._thread = threading.Thread(target=self._loop, name='ocr-janitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        self.sweep()
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                return
+
+    def stats(self):
+        """Return the number of files awaiting expiry."""
+        with self._lock:
+            return {'tracked_files': len(self._expiry)}
+
+def init_janitor(app):
+    """Create and start the upload janitor for the app."""
+    janitor = Janitor(
+        app.config['UPLOAD_FOLDER'],
+        app.config['FILE_RETENTION_HOURS'] * 3600,
+        app.config.get('CLEANUP_INTERVAL', 300)
+    )
+    app.extensions['ocr_janitor'] = janitor
+    janitor.start()
+    return janitor
+
+def get_janitor():
+    """Get the janitor for the current app."""
+    return current_app.extensions['ocr_janitor']
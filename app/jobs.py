@@ -0,0 +1,316 @@
+"""
+Background OCR jobs: submit a file, poll its progress, fetch the result.
+
+Jobs run on a bounded in-process executor. Their state lives in a job store,
+either in memory (single process) or in a SQLite database so that any
+gunicorn worker can answer status requests for jobs started by another.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.admission import get_admission
+from app.cache import get_cache
+from app.utils import build_result_payload
+
+logger = logging.getLogger(__name__)
+
+JOB_FIELDS = (
+    'id', 'status', 'filename', 'language', 'format', 'pages_done', 'pages_total',
+    'result', 'error', 'created_at', 'updated_at'
+)
+
+class MemoryJobStore:
+    """Job store for a single process."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def purge(self, older_than):
+        """Delete finished jobs last updated before the given timestamp."""
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['status'] in ('finished', 'failed', 'cancelled') and job['updated_at'] < older_than
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+class SqliteJobStore:
+    """Job store backed by a SQLite file shared by all workers on the host."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, status TEXT, filename TEXT, language TEXT, format TEXT, '
+                'pages_done INTEGER, pages_total INTEGER, result TEXT, error TEXT, '
+                'created_at REAL, updated_at REAL)'
+            )
+            # Databases created before results were kept whole lack the newer columns
+            existing = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for column in ('format', 'result'):
+                if column not in existing:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} TEXT')
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection that commits, or rolls back, and is closed when the block ends."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _encode(name, value):
+        # The result payload is kept as a JSON document
+        return json.dumps(value) if name == 'result' and value is not None else value
+
+    def create(self, job):
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' * len(JOB_FIELDS))})",
+                [self._encode(field, job.get(field)) for field in JOB_FIELDS]
+            )
+
+    def update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        columns = [name for name in fields if name in JOB_FIELDS]
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in columns)} WHERE id = ?",
+                [self._encode(name, fields[name]) for name in columns] + [job_id]
+            )
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_FIELDS, row))
+        if job['result'] is not None:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def purge(self, older_than):
+        """Delete finished jobs last updated before the given timestamp."""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('finished', 'failed', 'cancelled') AND updated_at < ?",
+                (older_than,)
+            )
+
+class JobQueue:
+    """Bounded executor that runs OCR jobs in the background."""
+
+    def __init__(self, app, store, workers, max_depth, batch_workers=None):
+        self.app = app
+        self.store = store
+        self.max_depth = max_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-job')
+        # Batch files get their own pool so a large batch cannot starve queued jobs
+        self._batch_executor = ThreadPoolExecutor(max_workers=batch_workers or workers, thread_name_prefix='ocr-batch')
+        self._depth = 0  # Jobs queued or running in this process
+        self._cancel_events = {}  # Job id -> Event, for jobs queued or running in this process
+        self._lock = threading.Lock()
+
+    def submit(self, processor, file_path, filename, language, cache_key=None, data=None, options=None,
+               output_format='text'):
+        """
+        Queue a staged upload for OCR.
+
+        The job owns the upload from here on: a file saved at file_path is
+        deleted when done, while in-memory uploads pass their contents as data.
+        When cache_key is given, a successful result is stored in the result cache.
+        options are passed through to process_file; output_format is recorded
+        so the result can be exported the way it was requested.
+
+        Returns:
+            str: The new job id, or None if the queue is full
+        """
+        with self._lock:
+            if self._depth >= self.max_depth:
+                return None
+            self._depth += 1
+
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self.store.create({
+            'id': job_id,
+            'status': 'queued',
+            'filename': filename,
+            'language': language,
+            'format': output_format,
+            'pages_done': 0,
+            'pages_total': None,
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        })
+        cancel_event = self._cancel_events[job_id] = threading.Event()
+        self._executor.submit(self._run, job_id, processor, file_path, language, cache_key, data, options or {}, cancel_event)
+        return job_id
+
+    def create_finished(self, filename, language, payload, output_format='text'):
+        """Record a job that is already complete, e.g. served from the cache."""
+        pages = payload.get('pages_processed') or 1
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self.store.create({
+            'id': job_id,
+            'status': 'finished',
+            'filename': filename,
+            'language': language,
+            'format': output_format,
+            'pages_done': pages,
+            'pages_total': pages,
+            'result': payload,
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        })
+        return job_id
+
+    def run_task(self, func, *args):
+        """Run func(*args) on the batch executor inside an application context.
+
+        Used for work that is streamed back to the caller rather than
+        tracked as a job, such as batch uploads. Callers bound how many
+        tasks they queue.
+
+        Returns:
+            Future: Resolves to func's return value
+        """
+        def task():
+            with self.app.app_context():
+                return func(*args)
+        return self._batch_executor.submit(task)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job.
+
+        A queued job never starts, whichever worker process queued it. A
+        running job stops once its pages in flight finish or reach
+        OCR_TIMEOUT; one running in another worker process is left to finish.
+
+        Returns:
+            dict: The job after cancelling, or None if not found
+        """
+        job = self.store.get(job_id)
+        if job is None or job['status'] not in ('queued', 'running'):
+            return job
+
+        cancel_event = self._cancel_events.get(job_id)
+        if cancel_event is not None:
+            cancel_event.set()
+        if job['status'] == 'queued':
+            self.store.update(job_id, status='cancelled', error='Job was cancelled')
+        return self.store.get(job_id)
+
+    def purge(self, max_age_seconds):
+        self.store.purge(time.time() - max_age_seconds)
+
+    def _run(self, job_id, processor, file_path, language, cache_key, data, options, cancel_event):
+        """Run one job inside an application context."""
+        try:
+            with self.app.app_context():
+                job = self.store.get(job_id)
+                if cancel_event.is_set() or job is None or job['status'] == 'cancelled':
+                    return
+                self.store.update(job_id, status='running')
+
+                def report_progress(pages_done, pages_total):
+                    self.store.update(job_id, pages_done=pages_done, pages_total=pages_total)
+
+                # Queued jobs were already accepted, so wait for OCR capacity without a timeout
+                pages = processor.estimate_pages(file_path, data, **options)
+                with get_admission().admit(pages, background=True):
+                    result = processor.process_file(
+                        file_path,
+                        language,
+                        progress_callback=report_progress,
+                        data=data,
+                        cancel_event=cancel_event,
+                        **options
+                    )
+
+                if result['success']:
+                    payload = build_result_payload(result)
+                    cache = get_cache()
+                    if cache is not None and cache_key is not None and not result.get('partial'):
+                        cache.set(cache_key, payload)
+                    self.store.update(job_id, status='finished', result=payload)
+                elif result.get('cancelled'):
+                    self.store.update(job_id, status='cancelled', error=result['error'])
+                else:
+                    self.store.update(job_id, status='failed', error=result['error'])
+        except Exception as e:
+            logger.error(f"OCR job {job_id} failed: {str(e)}")
+            self.store.update(job_id, status='failed', error='An unexpected error occurred during processing')
+        finally:
+            if data is None:
+                try:
+                    os.remove(file_path)
+                except OSError as e:
+                    logger.warning(f"Failed to clean up job file {file_path}: {str(e)}")
+            with self._lock:
+                self._depth -= 1
+                self._cancel_events.pop(job_id, None)
+
+def init_jobs(app):
+    """Create the background job queue and attach it to the app."""
+    if app.config.get('JOB_BACKEND', 'memory') == 'sqlite':
+        store = SqliteJobStore(app.config['JOB_DB_PATH'])
+    else:
+        store = MemoryJobStore()
+
+    workers = max(1, int(app.config.get('JOB_WORKERS') or 1))
+    max_depth = max(workers, int(app.config.get('JOB_QUEUE_DEPTH') or workers))
+
+    batch_workers = max(1, int(app.config.get('BATCH_WORKERS') or workers))
+    queue = JobQueue(app, store, workers, max_depth, batch_workers)
+    app.extensions['ocr_jobs'] = queue
+    
+    # Expire finished jobs along with uploads
+    retention_seconds = app.config['FILE_RETENTION_HOURS'] * 3600
+    app.extensions['ocr_janitor'].add_task(lambda: queue.purge(retention_seconds))
+    return queue
+
+def get_job_queue():
+    """Get the job queue for the current app."""
+    return current_app.extensions['ocr_jobs']
@@ -0,0 +1,146 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Counters, gauges and histograms are process-wide and thread-safe, so page
+workers can record into them without an application context. With several
+gunicorn workers each process reports its own series.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(label_names, label_values):
+    if not label_names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(label_names, label_values)
+    )
+    return '{' + pairs + '}'
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {value}')
+        return lines
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, amount=1, *label_values):
+        self.inc(-amount, *label_values)
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += 1
+            state[2] += value
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for label_values, (bucket_counts, count, total) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    labels = _format_labels(self.label_names + ('le',), label_values + (bound,))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = _format_labels(self.label_names + ('le',), label_values + ('+Inf',))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f'{self.name}_count{labels} {count}')
+                lines.append(f'{self.name}_sum{labels} {total}')
+        return lines
+
+STAGE_SECONDS = Histogram('ocr_stage_seconds', 'Time spent in each processing stage', ('stage',))
+REQUESTS = Counter('ocr_requests_total', 'Requests handled by endpoint and status code', ('endpoint', 'status'))
+IN_FLIGHT = Gauge('ocr_requests_in_flight', 'Requests currently being processed', ('endpoint',))
+PAGES = Counter('ocr_pages_total', 'Pages processed by source', ('source',))
+UPLOAD_BYTES = Counter('ocr_upload_bytes_total', 'Bytes of uploaded files accepted for OCR')
+CACHE_LOOKUPS = Gauge('ocr_cache_lookups', 'Result cache lookups by outcome in this process', ('outcome',))
+CACHE_BYTES = Gauge('ocr_cache_bytes', 'Size of cached OCR results in bytes')
+PAGE_CACHE_LOOKUPS = Gauge('ocr_page_dedup_lookups', 'Duplicate page lookups by outcome in this process', ('outcome',))
+PAGE_CACHE_ENTRIES = Gauge('ocr_page_dedup_entries', 'Page hashes in the duplicate page cache')
+ADMISSION_PAGES = Gauge('ocr_admission_pages_in_flight', 'Estimated pages admitted for OCR')
+ADMISSION_WAITING = Gauge('ocr_admission_waiting', 'Requests waiting for OCR capacity')
+ADMISSION_REJECTED = Counter('ocr_admission_rejected_total', 'Requests turned away by status code', ('status',))
+JANITOR_TRACKED = Gauge('ocr_janitor_tracked_files', 'Spooled upload files awaiting expiry')
+ENGINE_INFO = Gauge('ocr_engine_info', 'OCR engine in use', ('engine', 'tesseract_version', 'poppler_version'))
+
+ALL_METRICS = [STAGE_SECONDS, REQUESTS, IN_FLIGHT, PAGES, UPLOAD_BYTES, CACHE_LOOKUPS, CACHE_BYTES,
+               PAGE_CACHE_LOOKUPS, PAGE_CACHE_ENTRIES, ADMISSION_PAGES, ADMISSION_WAITING, ADMISSION_REJECTED,
+               JANITOR_TRACKED, ENGINE_INFO]
+
+def record_stage(stage, seconds, timings=None):
+    """Observe a stage duration and add it to a per-request timings dict if given."""
+    STAGE_SECONDS.observe(seconds, stage)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def timed(stage, timings=None):
+    """Time the enclosed block as the given stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started, timings)
+
+def render():
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+def format_server_timing(timings):
+    """Format per-request stage timings as a Server-Timing header value."""
+    return ', '.join(f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in timings.items())
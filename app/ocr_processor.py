@@ -1,8 +1,22 @@
 import os
+import io
+import re
 import logging
-from PIL import Image
+import threading
+import math
+import time
+import shutil
+import subprocess
+from collections import deque, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError  # Distinct from TimeoutError before Python 3.11
+from PIL import Image, ImageSequence
 from flask import current_app
 import tempfile
+from app.cache import make_cache_key, hash_stream, get_cache
+from app import engines, preprocessing, metrics, structure, zones
+from app.dedup import dhash, get_page_cache
+from app.capabilities import get_capabilities
 
 # Try to import OCR dependencies, fall back to mock if not available
 try:
@@ -14,76 +28,353 @@ except ImportError:
     TESSERACT_AVAILABLE = False
     print("Warning: PyTesseract not available. Using mock OCR for demonstration.")
 
+# Language value that asks for per-page script detection
+AUTO_LANGUAGE = 'auto'
+
+# Image types OCR'd directly with Pillow
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp', '.bmp', '.gif')
+
+# Image types whose frames are OCR'd as pages, like a PDF (multi-page faxes, animations)
+MULTI_FRAME_EXTENSIONS = ('.tif', '.tiff', '.webp', '.gif')
+
+# Settings that change OCR output besides the Tesseract config and preprocessing, for the result cache key
+OUTPUT_SETTINGS = (
+    'OCR_ENGINE', 'IMAGE_MAX_PIXELS', 'PDF_DPI', 'PDF_TARGET_PIXELS', 'PDF_MIN_DPI', 'PDF_MAX_DPI',
+    'PDF_USE_TEXT_LAYER', 'PDF_TEXT_LAYER_MIN_CHARS'
+)
+
+def _ocr_page(image, language, config, engine_name='pytesseract', tesseract_cmd=None, tessdata_path=None,
+              preprocess_settings=None, structured=False, pdf_page_path=None, auto_language=None, rotate=0,
+              timeout=0):
+    """Run Tesseract on a single page image.
+
+    Kept at module level so it can be pickled into a process pool worker,
+    where the Tesseract path configured in the parent is not inherited.
+
+    With auto_language settings, an OSD pass first picks the page's
+    rotation and language; otherwise the page is turned `rotate` degrees
+    clockwise before OCR. Each Tesseract call is stopped after `timeout`
+    seconds (0 for no limit) and raises TimeoutError.
+
+    Returns:
+        tuple: (text, {stage name: seconds}, {'language', 'rotate'}) covering
+            detection, preprocessing and OCR. When structured, text is replaced
+            by {'width', 'height', 'words'} with word columns from the same
+            Tesseract pass. When pdf_page_path is given, that pass also writes
+            a searchable PDF of the page there
+    """
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    timings = {}
+    engine = engines.get_engine(engine_name, tessdata_path)
+    if auto_language:
+        started = time.perf_counter()
+        rotate, language = _detect_language(image, engine, auto_language, timeout)
+        timings['osd'] = time.perf_counter() - started
+    if rotate:
+        image = image.rotate(-rotate, expand=True)
+
+    if preprocess_settings:
+        image, stage_timings = preprocessing.preprocess(image, preprocess_settings)
+        timings.update(stage_timings)
+
+    started = time.perf_counter()
+    if pdf_page_path:
+        # Only the tesseract CLI has the PDF renderer
+        output = engines.get_engine('pytesseract').image_to_string_and_pdf(
+            image, language, config, pdf_page_path, timeout
+        )
+    elif structured:
+        words = structure.words_from_tesseract(engine.image_to_data(image, language, config, timeout))
+        output = {'width': image.width, 'height': image.height, 'words': words}
+    else:
+        output = engine.image_to_string(image, language, config, timeout)
+    timings['ocr'] = time.perf_counter() - started
+    return output, timings, {'language': language, 'rotate': rotate}
+
+def _detect_language(image, engine, settings, timeout=0):
+    """Pick (clockwise rotation, language) for a page from an OSD pass on a downscaled copy."""
+    factor = math.ceil(max(image.size) / settings['max_side'])
+    if factor > 1:
+        dpi = image.info.get('dpi')
+        image = image.reduce(factor)
+        if dpi:
+            image.info['dpi'] = (dpi[0] / factor, dpi[1] / factor)  # reduce() copies info unchanged
+    try:
+        rotate, script = engine.detect_orientation_script(image, timeout)
+    except Exception as e:
+        # Blank pages, too little text or no osd.traineddata
+        logging.getLogger(__name__).warning(f"Script detection failed, using {settings['fallback']}: {str(e)}")
+        return 0, settings['fallback']
+    return rotate, settings['scripts'].get(script, settings['fallback'])
+
+def _record_timings(totals, timings):
+    """Record one page's stage seconds as metrics and accumulate them into totals."""
+    for stage, seconds in timings.items():
+        metrics.record_stage(stage, seconds, totals)
+
+class _Deadline:
+    """Time budget for one document, which a cancel event can end early."""
+
+    def __init__(self, seconds, page_seconds, cancel_event=None):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.page_seconds = page_seconds or 0
+        self.cancel_event = cancel_event
+
+    def remaining(self):
+        """Seconds left for the document, or None without a document limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def page_timeout(self):
+        """Seconds the next page may run: the page limit, cut short by the document limit (0 = none)."""
+        remaining = self.remaining()
+        if remaining is None:
+            return self.page_seconds
+        remaining = max(0.1, remaining)
+        return min(self.page_seconds, remaining) if self.page_seconds else remaining
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
 class OCRProcessor:
     """Handles OCR processing for various file types."""
     
     def __init__(self):
         """Initialize OCR processor with configuration."""
         self.logger = logging.getLogger(__name__)
-        self.tesseract_available = None  # Will be determined on first use
+        self._page_executor = None  # Created on first PDF so it can be sized from config
+        self._executor_lock = threading.Lock()
 
-    def _ensure_tesseract_configured(self):
-        """Ensure Tesseract is configured and test availability."""
-        if self.tesseract_available is not None:
-            return self.tesseract_available
+    def _get_page_executor(self):
+        """Get the shared worker pool used to OCR PDF pages concurrently."""
+        if self._page_executor is None:
+            with self._executor_lock:
+                if self._page_executor is None:
+                    workers = max(1, int(current_app.config.get('OCR_PAGE_WORKERS') or os.cpu_count() or 1))
+                    worker_type = current_app.config.get('OCR_WORKER_TYPE', 'thread')
+                    if worker_type == 'process':
+                        self._page_executor = ProcessPoolExecutor(max_workers=workers)
+                    else:
+                        self._page_executor = ThreadPoolExecutor(
+                            max_workers=workers,
+                            thread_name_prefix='ocr-page'
+                        )
+                    self.logger.info(f"OCR page pool started: {workers} {worker_type} worker(s)")
+        return self._page_executor
 
-        # Configure Tesseract path
-        try:
-            if hasattr(current_app, 'config') and current_app.config.get('TESSERACT_CMD'):
-                pytesseract.pytesseract.tesseract_cmd = current_app.config['TESSERACT_CMD']
-                self.logger.info(f"Tesseract path configured: {current_app.config['TESSERACT_CMD']}")
-        except Exception as e:
-            self.logger.warning(f"Failed to configure Tesseract path: {e}")
+    def _submit_page(self, image, language, config, structured=False, pdf_page_path=None, detected=None,
+                     timeout=0):
+        """Queue one image for OCR on the page pool with the configured engine.
 
-        # Test Tesseract availability
-        if not TESSERACT_AVAILABLE:
-            self.tesseract_available = False
-            return False
+        Pages rendered into a searchable PDF are not preprocessed, since the
+        PDF shows the image Tesseract was given. With the 'auto' language,
+        pages run script detection first unless an earlier detection for
+        the page is given as `detected`. Tesseract is stopped after
+        `timeout` seconds (0 for no limit).
+        """
+        auto_language = None
+        rotate = 0
+        if language == AUTO_LANGUAGE:
+            if detected:
+                language, rotate = detected['language'], detected['rotate']
+            else:
+                auto_language = self._get_auto_language_settings()
 
-        try:
-            version = pytesseract.get_tesseract_version()
-            self.logger.info(f"Tesseract OCR available: {version}")
-            self.tesseract_available = True
-            return True
-        except Exception as e:
-            self.logger.warning(f"Tesseract not available: {e}")
-            self.tesseract_available = False
-            return False
+        return self._get_page_executor().submit(
+            _ocr_page,
+            image,
+            language,
+            config,
+            current_app.config.get('OCR_ENGINE', 'pytesseract'),
+            pytesseract.pytesseract.tesseract_cmd,
+            current_app.config.get('TESSDATA_PATH'),
+            None if pdf_page_path else self._get_preprocess_settings(structured),
+            structured,
+            pdf_page_path,
+            auto_language,
+            rotate,
+            timeout
+        )
+
+    def _get_auto_language_settings(self):
+        """Script -> language choices for the 'auto' language, limited to installed languages."""
+        config = current_app.config
+        installed = set(get_capabilities()['languages'])
+        scripts = {}
+        for script, languages in config.get('OCR_SCRIPT_LANGUAGES', {}).items():
+            available = '+'.join(lang for lang in languages.split('+') if lang in installed)
+            if available:
+                scripts[script] = available
+        return {
+            'scripts': scripts,
+            'fallback': config.get('OCR_AUTO_FALLBACK_LANGUAGE', 'eng'),
+            'max_side': max(1, config.get('OCR_OSD_MAX_SIDE', 1600))
+        }
+
+    def _load_detections(self, file_path, data):
+        """Earlier per-page detections for this document from the result cache.
+
+        Returns:
+            tuple: (cache key or None, {page number: {'language', 'rotate'}})
+        """
+        cache = get_cache()
+        if cache is None:
+            return None, {}
+        if data is not None:
+            file_hash = hash_stream(io.BytesIO(data))
+        else:
+            with open(file_path, 'rb') as f:
+                file_hash = hash_stream(f)
+        key = make_cache_key(file_hash, AUTO_LANGUAGE, 'osd')
+        cached = cache.get(key) or {}
+        return key, {int(page): detected for page, detected in cached.items()}
+
+    def _get_preprocess_settings(self, structured=False):
+        """Preprocessing options for page workers, or None when disabled.
+
+        Structured results skip stages that move pixels, so word boxes stay
+        in the coordinates of the original page image.
+        """
+        config = current_app.config
+        if not config.get('OCR_PREPROCESS', False):
+            return None
+        stages = list(config.get('PREPROCESS_STAGES', preprocessing.DEFAULT_STAGES))
+        if structured:
+            stages = [stage for stage in stages if stage not in preprocessing.GEOMETRY_STAGES]
+        return {
+            'stages': stages,
+            'target_text_height': config.get('PREPROCESS_TARGET_TEXT_HEIGHT', 32),
+            'max_skew': config.get('PREPROCESS_MAX_SKEW', 10.0),
+            'binarize_window': config.get('PREPROCESS_BINARIZE_WINDOW', 31),
+            'binarize_k': config.get('PREPROCESS_BINARIZE_K', 0.2),
+            'crop_margin': config.get('PREPROCESS_CROP_MARGIN', 10)
+        }
+
+    def _ensure_tesseract_configured(self):
+        """Check Tesseract availability using the process-wide capability probe."""
+        return get_capabilities()['tesseract']['available']
         
-    def process_file(self, file_path, language='eng'):
+    def process_file(self, file_path, language='eng', progress_callback=None, data=None,
+                     first_page=None, last_page=None, structured=False, searchable_pdf=None, template=None,
+                     page_callback=None, cancel_event=None):
         """
         Process a file and extract text using OCR.
         
         Args:
             file_path (str): Path to the file to process
             language (str): Tesseract language code (default: 'eng')
+            progress_callback (callable): Optional callback(pages_done, pages_total)
+                invoked as pages finish
+            data (bytes): File contents already in memory. When given, file_path
+                only supplies the name and extension and is never read
+            first_page (int): First PDF page or image frame to process (default: 1)
+            last_page (int): Last PDF page or image frame to process (default: last
+                page, capped at PDF_MAX_PAGES pages from first_page)
+            structured (bool): Also return word boxes, layout and confidences
+                from the same Tesseract pass. Every PDF page is OCR'd, since
+                embedded text layers carry no word boxes
+            searchable_pdf (str): Path to write a searchable PDF (page images
+                with an invisible text layer) to, from the same Tesseract pass
+            template (dict): Parsed zone template (see app.zones). Only its
+                zones are OCR'd, and the result carries a field -> value map
+            page_callback (callable): Optional callback(event) invoked with
+                {'page', 'text', 'pages_done', 'pages_total', 'timings'} as
+                each page finishes, in page order
+            cancel_event (threading.Event): When set, no further pages are
+                started and a failed result with 'cancelled' is returned
+
+        Each page's Tesseract run is stopped after OCR_TIMEOUT seconds, and
+        the page is reported as failed. Once OCR_DOCUMENT_TIMEOUT seconds
+        have passed no further pages are started, and the pages finished so
+        far are returned with 'partial' set. Results with failed pages are
+        also 'partial', and list them in 'failed_pages'.
+
+        A language of 'auto' detects the script and orientation of each page
+        with an OSD pass, rotates the page upright and OCRs it with the
+        languages configured for that script. Detections are kept in the
+        result cache per document, and reported in the result as 'detected'.
             
         Returns:
-            dict: Result containing success status, text, and any errors
+            dict: Result containing success status, text, and any errors. PDF
+                and multi-frame image results also report pages_processed and total_pages,
+                structured results a columnar 'data' document (see app.structure)
+                and template results 'fields'
         """
         try:
+            deadline = _Deadline(
+                current_app.config.get('OCR_DOCUMENT_TIMEOUT', 300),
+                current_app.config.get('OCR_TIMEOUT', 30),
+                cancel_event
+            )
+            
             # Validate file exists
-            if not os.path.exists(file_path):
+            if data is None and not os.path.exists(file_path):
                 return {
                     'success': False,
                     'error': 'File not found',
                     'text': ''
                 }
             
+            if searchable_pdf and not self._ensure_tesseract_configured():
+                return {
+                    'success': False,
+                    'error': 'Searchable PDF output requires Tesseract to be installed and configured properly.',
+                    'text': ''
+                }
+            
             # Get file extension
             file_ext = os.path.splitext(file_path)[1].lower()
             
+            if template:
+                if language == AUTO_LANGUAGE:
+                    # Zones are too small for script detection
+                    language = current_app.config.get('OCR_AUTO_FALLBACK_LANGUAGE', 'eng')
+                if not self._ensure_tesseract_configured():
+                    return {
+                        'success': False,
+                        'error': 'Template OCR requires Tesseract to be installed and configured properly.',
+                        'text': ''
+                    }
+                return self._process_template(file_path, file_ext, language, template, progress_callback, data, deadline)
+            
+            detections = None
+            if language == AUTO_LANGUAGE and self._ensure_tesseract_configured():
+                detections_key, detections = self._load_detections(file_path, data)
+            
             # Process based on file type
             if file_ext == '.pdf':
-                return self._process_pdf(file_path, language)
-            elif file_ext in ['.jpg', '.jpeg', '.png']:
-                return self._process_image(file_path, language)
+                if data is not None and self._ensure_tesseract_configured():
+                    result = self._process_pdf_bytes(data, language, progress_callback, first_page, last_page,
+                                                     structured, searchable_pdf, detections, page_callback, deadline)
+                else:
+                    result = self._process_pdf(file_path, language, progress_callback, first_page, last_page,
+                                               structured, searchable_pdf, detections, page_callback, deadline)
+            elif file_ext in IMAGE_EXTENSIONS:
+                result = self._process_image(file_path, language, progress_callback, data, structured,
+                                             searchable_pdf, detections, page_callback, deadline,
+                                             first_page, last_page)
             else:
                 return {
                     'success': False,
                     'error': f'Unsupported file type: {file_ext}',
                     'text': ''
                 }
+            
+            if detections and result['success']:
+                if detections_key is not None:
+                    get_cache().set(detections_key, {str(page): detected for page, detected in detections.items()})
+                first, last = first_page or 1, last_page or float('inf')
+                result['detected'] = [
+                    {'page': page, **detections[page]}
+                    for page in sorted(detections) if first <= page <= last
+                ]
+            return result
                 
         except Exception as e:
             self.logger.error(f"OCR processing error: {str(e)}")
@@ -93,37 +384,77 @@ class OCRProcessor:
                 'text': ''
             }
     
-    def _process_image(self, image_path, language):
-        """Process a single image file."""
+    def _process_image(self, image_path, language, progress_callback=None, data=None, structured=False,
+                       searchable_pdf=None, detections=None, page_callback=None, deadline=None,
+                       first_page=None, last_page=None):
+        """Process a single image file, from disk or from in-memory data.
+
+        Multi-frame images (TIFF, WebP, GIF) are handed to _process_frames,
+        which OCRs frames first_page to last_page as pages.
+        """
         try:
             # Open and validate image
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
+            with Image.open(io.BytesIO(data) if data is not None else image_path) as img:
+                if (os.path.splitext(image_path)[1].lower() in MULTI_FRAME_EXTENSIONS
+                        and getattr(img, 'n_frames', 1) > 1 and self._ensure_tesseract_configured()):
+                    return self._process_frames(img, language, progress_callback, first_page, last_page,
+                                                structured, searchable_pdf, detections, page_callback, deadline)
+
+                timings = {}
+                with metrics.timed('decode', timings):
+                    img = self._decode_image(img, 'RGB' if searchable_pdf else 'L', downscale=not structured)
 
+                document = structure.empty_document() if structured else None
                 if self._ensure_tesseract_configured():
                     # Configure Tesseract
                     config = self._get_tesseract_config()
 
-                    # Extract text
-                    text = pytesseract.image_to_string(
-                        img,
-                        lang=language,
-                        config=config
+                    # Extract text on the page pool, where engine instances stay warm
+                    detected = detections.get(1) if detections is not None else None
+                    future = self._submit_page(
+                        img, language, config, structured, searchable_pdf, detected,
+                        deadline.page_timeout() if deadline else 0
                     )
+                    try:
+                        output, page_timings, page_info = future.result(deadline.remaining() if deadline else None)
+                    except (TimeoutError, FutureTimeoutError) as e:
+                        future.cancel()
+                        metrics.PAGES.inc(1, 'timeout')
+                        raise TimeoutError(str(e) or 'Time limit reached while waiting for an OCR worker') from e
+                    _record_timings(timings, page_timings)
+                    if detections is not None:
+                        detections[1] = page_info
+                    metrics.PAGES.inc(1, 'ocr')
+
+                    if structured:
+                        structure.add_page(document, 1, output['width'], output['height'], output['words'])
+                        text = structure.words_to_text(output['words'])
+                    else:
+                        text = output
                 else:
                     # Mock OCR for demonstration
                     text = self._mock_ocr_text(image_path)
+                    metrics.PAGES.inc(1, 'mock')
+
+                if progress_callback:
+                    progress_callback(1, 1)
 
                 # Clean and validate text
-                text = self._clean_text(text)
+                with metrics.timed('clean', timings):
+                    text = self._clean_text(text)
 
-                return {
+                if page_callback:
+                    page_callback({'page': 1, 'text': text, 'pages_done': 1, 'pages_total': 1, 'timings': timings})
+
+                result = {
                     'success': True,
                     'text': text,
-                    'error': None
+                    'error': None,
+                    'timings': timings
                 }
+                if structured:
+                    result['data'] = document
+                return result
 
         except Exception as e:
             self.logger.error(f"Image processing error: {str(e)}")
@@ -133,56 +464,278 @@ class OCRProcessor:
                 'text': ''
             }
     
-    def _process_pdf(self, pdf_path, language):
-        """Process a PDF file by converting to images first."""
+    def _process_frames(self, img, language, progress_callback=None, first_page=None, last_page=None,
+                        structured=False, searchable_pdf=None, detections=None, page_callback=None,
+                        deadline=None):
+        """
+        OCR the frames of an open multi-frame image as pages.
+
+        Frames are decoded one at a time, only as the page pool has room for
+        them, and are scheduled, reported and headed like rasterized PDF
+        pages. The page range and PDF_MAX_PAGES apply as they do to PDFs.
+        """
+        deadline = deadline or _Deadline(0, 0)
+        total_pages = img.n_frames
+        first_page = max(1, first_page or 1)
+        if first_page > total_pages:
+            return {
+                'success': False,
+                'error': f'Page range starts after the last page (document has {total_pages} pages)',
+                'text': '',
+                'pages_processed': 0,
+                'total_pages': total_pages
+            }
+
+        max_pages = current_app.config.get('PDF_MAX_PAGES', 200)
+        last_page = min(last_page or total_pages, total_pages, first_page + max_pages - 1)
+        pages_in_range = last_page - first_page + 1
+
+        # Frames of one file share a size as a rule, so the first one sizes the window
+        budget = current_app.config.get('PDF_RENDER_MEMORY_MB', 128) * 1024 * 1024
+        frame_pixels = img.width * img.height
+        if not structured:
+            frame_pixels = min(frame_pixels, current_app.config.get('IMAGE_MAX_PIXELS', 8_400_000) or frame_pixels)
+        window = max(1, budget // max(1, frame_pixels * (3 if searchable_pdf else 1)))
+
+        timings = {}
+        all_text = []
+        failed_pages = []
+        document = structure.empty_document() if structured else None
+        pdf_dir = tempfile.mkdtemp(prefix='ocr-pdf-') if searchable_pdf else None
+        try:
+            pages = self._iter_image_frames(img, first_page, last_page, timings,
+                                            'RGB' if searchable_pdf else 'L', downscale=not structured)
+            page_results = self._ocr_pages(pages, language, window, timings, structured, pdf_dir, detections, deadline)
+            pages_done, partial = self._gather_pages(
+                page_results, all_text, document, 0, pages_in_range, progress_callback, page_callback, deadline,
+                failed_pages
+            )
+            pages_processed = pages_done - len(failed_pages)
+            if deadline.cancelled():
+                self.logger.info(f"Image processing cancelled after {pages_processed} frame(s)")
+                return {
+                    'success': False,
+                    'cancelled': True,
+                    'error': 'Processing was cancelled',
+                    'text': '',
+                    'pages_processed': pages_processed,
+                    'total_pages': total_pages
+                }
+            if partial:
+                self.logger.warning(
+                    f"Image time limit reached; returning {pages_processed} of {pages_in_range} frame(s)"
+                )
+            if failed_pages:
+                self.logger.warning(f"Image frame(s) {failed_pages} failed and are left out of the result")
+
+            if searchable_pdf:
+                with metrics.timed('pdf_assemble', timings):
+                    # Only frames that failed or were never reached may lack a text layer
+                    bare_pages = set(failed_pages) | set(range(first_page + pages_done, last_page + 1))
+                    self._assemble_searchable_pdf(None, pdf_dir, first_page, last_page, searchable_pdf,
+                                                  current_app.config.get('POPPLER_PATH') or None, bare_pages)
+
+            with metrics.timed('clean', timings):
+                combined_text = self._clean_text('\n\n'.join(all_text))
+
+            result = {
+                'success': True,
+                'text': combined_text,
+                'error': None,
+                'pages_processed': pages_processed,
+                'total_pages': total_pages,
+                'timings': timings
+            }
+            if structured:
+                result['data'] = document
+            if partial or failed_pages:
+                result['partial'] = True
+            if failed_pages:
+                result['failed_pages'] = failed_pages
+            return result
+        finally:
+            if pdf_dir:
+                shutil.rmtree(pdf_dir, ignore_errors=True)
+
+    def _iter_image_frames(self, img, first_page, last_page, timings=None, mode='L', downscale=True):
+        """Yield (page_number, image, None) for a range of frames, decoding one frame per step."""
+        frames = ImageSequence.Iterator(img)
+        for page_number in range(first_page, last_page + 1):
+            with metrics.timed('decode', timings):
+                # Decoding copies the frame, so the next seek cannot change it under the page pool
+                image = self._decode_image(frames[page_number - 1], mode, downscale)
+            yield page_number, image, None
+
+    def _decode_image(self, img, mode='L', downscale=True):
+        """
+        Decode an opened image (or frame) for OCR into a new image in `mode`.
+
+        Tesseract reads grayscale, so colour is only kept where the page image
+        itself is output (searchable PDFs). With downscale, images over
+        IMAGE_MAX_PIXELS are brought down to about that size: JPEGs are
+        decoded at 1/2, 1/4 or 1/8 scale by libjpeg (draft mode) and the rest
+        is box-filtered after an integer reduce().
+
+        DPI metadata is dropped: phones and screenshots write 72 whatever the
+        text size, so Tesseract estimates the resolution of uploaded images
+        itself. Only rasterized PDF pages, whose DPI is known, carry one.
+
+        Raises:
+            ValueError: If more than IMAGE_MAX_DECODE_PIXELS would be decoded
+        """
+        config = current_app.config
+        max_pixels = config.get('IMAGE_MAX_PIXELS', 8_400_000) if downscale else 0
+        max_decode_pixels = config.get('IMAGE_MAX_DECODE_PIXELS', 50_000_000)
+        target_size = None
+        if max_pixels and img.width * img.height > max_pixels:
+            scale = math.sqrt(max_pixels / (img.width * img.height))
+            target_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+
+        if img.format == 'JPEG':
+            # A no-op once the pixels are loaded; also skips the YCbCr -> RGB step for grayscale
+            img.draft(mode if mode in ('L', 'RGB') else None, target_size)
+
+        if max_decode_pixels and img.width * img.height > max_decode_pixels:
+            raise ValueError(
+                f'Image is too large to process ({img.width}x{img.height} pixels, '
+                f'at most {max_decode_pixels / 1_000_000:g} megapixels)'
+            )
+
+        if img.mode not in ('L', 'RGB'):
+            img = img.convert(mode)  # Palette and bilevel images cannot be resampled directly
+        if target_size and img.width > target_size[0]:
+            # reducing_gap runs an integer reduce() first, so the box filter only sees a small image
+            img = img.resize(target_size, Image.Resampling.BOX, reducing_gap=2.0)
+        image = img.convert(mode)  # Always a copy, so later seeks of a multi-frame image leave it alone
+        image.info.pop('dpi', None)
+        return image
+
+    def _process_pdf_bytes(self, data, language, progress_callback=None, first_page=None, last_page=None,
+                           structured=False, searchable_pdf=None, detections=None, page_callback=None,
+                           deadline=None):
+        """Process an in-memory PDF.
+
+        Poppler needs a file path, so the document is written once to the
+        local temp directory (not the upload folder) for the duration of
+        rendering. pdf2image's convert_from_bytes would do the same, but
+        once per rendered page.
+        """
+        fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            return self._process_pdf(pdf_path, language, progress_callback, first_page, last_page,
+                                     structured, searchable_pdf, detections, page_callback, deadline)
+        finally:
+            try:
+                os.remove(pdf_path)
+            except OSError as e:
+                self.logger.warning(f"Failed to remove temporary PDF {pdf_path}: {str(e)}")
+
+    def _process_pdf(self, pdf_path, language, progress_callback=None, first_page=None, last_page=None,
+                     structured=False, searchable_pdf=None, detections=None, page_callback=None,
+                     deadline=None):
+        """Process a PDF file by converting to images first, in chunks of pages."""
+        deadline = deadline or _Deadline(0, 0)
+        pages_done = 0
+        pages_processed = 0
+        failed_pages = []
+        text_pages = set()  # Pages read from the PDF's own text layer
+        partial = False
+        total_pages = None
+        timings = {}
+        document = structure.empty_document() if structured else None
+        # Searchable page PDFs are spooled here and joined at the end, never held in memory
+        pdf_dir = tempfile.mkdtemp(prefix='ocr-pdf-') if searchable_pdf else None
         try:
             if self._ensure_tesseract_configured():
                 # Check if Poppler is available
                 try:
-                    # Test Poppler availability
-                    import pdf2image
-                    # Get Poppler path from config
-                    poppler_path = None
-                    if hasattr(current_app, 'config') and current_app.config.get('POPPLER_PATH'):
-                        poppler_path = current_app.config['POPPLER_PATH']
-                    # Try to get PDF info to test Poppler
-                    pdf2image.pdfinfo_from_path(pdf_path, poppler_path=poppler_path)
+                    if not get_capabilities()['poppler']['available']:
+                        raise pdf2image.exceptions.PDFInfoNotInstalledError('Poppler was not found when probing capabilities')
 
                     # Get Poppler path from config
                     poppler_path = None
                     if hasattr(current_app, 'config') and current_app.config.get('POPPLER_PATH'):
                         poppler_path = current_app.config['POPPLER_PATH']
+                    chunk_size = max(1, current_app.config.get('PDF_CHUNK_PAGES', 20))
+                    first_page = max(1, first_page or 1)
 
-                    # Convert PDF to images
-                    images = pdf2image.convert_from_path(
-                        pdf_path,
-                        dpi=300,  # High DPI for better OCR accuracy
-                        first_page=1,
-                        last_page=10,  # Limit to first 10 pages for performance
-                        poppler_path=poppler_path
-                    )
+                    with metrics.timed('pdf_info', timings):
+                        pdf_info = pdf2image.pdfinfo_from_path(pdf_path, poppler_path=poppler_path,
+                                                               timeout=deadline.page_timeout() or None)
+                    total_pages = int(pdf_info.get('Pages', 1))
+
+                    if first_page > total_pages:
+                        return {
+                            'success': False,
+                            'error': f'Page range starts after the last page (document has {total_pages} pages)',
+                            'text': '',
+                            'pages_processed': 0,
+                            'total_pages': total_pages
+                        }
+
+                    max_pages = current_app.config.get('PDF_MAX_PAGES', 200)
+                    last_page = min(last_page or total_pages, total_pages, first_page + max_pages - 1)
+                    pages_in_range = last_page - first_page + 1
 
                     all_text = []
 
-                    # Process each page
-                    for i, image in enumerate(images):
-                        try:
-                            # Configure Tesseract
-                            config = self._get_tesseract_config()
-
-                            # Extract text from page
-                            page_text = pytesseract.image_to_string(
-                                image,
-                                lang=language,
-                                config=config
+                    # Process in chunks so per-chunk probing, memory and time stay bounded
+                    for chunk_start in range(first_page, last_page + 1, chunk_size):
+                        chunk_end = min(chunk_start + chunk_size - 1, last_page)
+                        if deadline.expired():
+                            partial = True
+                            break
+
+                        # Decide per page: use the embedded text layer or rasterize at a size-aware DPI
+                        with metrics.timed('pdf_info', timings):
+                            page_sizes = self._get_page_sizes(pdf_path, chunk_start, chunk_end, poppler_path)
+                        with metrics.timed('text_layer', timings):
+                            page_plan = self._plan_pdf_pages(
+                                pdf_path, page_sizes, chunk_start, chunk_end, poppler_path, use_text_layer=not structured
                             )
+                        text_pages.update(page_number for page_number, _, text in page_plan if text is not None)
+                        window = self._get_render_window(page_plan, page_sizes)
+
+                        # Rasterize lazily so only `window` pages are held in memory
+                        pages = self._iter_pdf_pages(pdf_path, page_plan, poppler_path, timings, deadline)
 
-                            if page_text.strip():
-                                all_text.append(f"--- Page {i+1} ---\n{page_text}")
+                        page_results = self._ocr_pages(pages, language, window, timings, structured, pdf_dir,
+                                                       detections, deadline)
+                        pages_done, partial = self._gather_pages(
+                            page_results, all_text, document, pages_done, pages_in_range,
+                            progress_callback, page_callback, deadline, failed_pages
+                        )
+                        pages_processed = pages_done - len(failed_pages)
+                        if deadline.cancelled():
+                            self.logger.info(f"PDF processing cancelled after {pages_processed} page(s)")
+                            return {
+                                'success': False,
+                                'cancelled': True,
+                                'error': 'Processing was cancelled',
+                                'text': '',
+                                'pages_processed': pages_processed,
+                                'total_pages': total_pages
+                            }
 
-                        except Exception as e:
-                            self.logger.warning(f"Error processing PDF page {i+1}: {str(e)}")
-                            continue
+                        self.logger.info(f"Processed PDF pages {chunk_start}-{chunk_end} of {total_pages}")
+                        if partial:
+                            break
+
+                    if partial:
+                        self.logger.warning(
+                            f"PDF time limit reached; returning {pages_processed} of {pages_in_range} page(s)"
+                        )
+                    if failed_pages:
+                        self.logger.warning(f"PDF page(s) {failed_pages} failed and are left out of the result")
+
+                    if searchable_pdf:
+                        with metrics.timed('pdf_assemble', timings):
+                            # Only text layer pages and pages that failed or were never reached lack a page PDF
+                            bare_pages = text_pages | set(failed_pages) | set(range(first_page + pages_done, last_page + 1))
+                            self._assemble_searchable_pdf(pdf_path, pdf_dir, first_page, last_page, searchable_pdf,
+                                                          poppler_path, bare_pages)
 
                     # Combine all text
                     combined_text = '\n\n'.join(all_text)
@@ -219,14 +772,26 @@ class OCRProcessor:
             else:
                 # Mock OCR for PDF when Tesseract is not available
                 combined_text = self._mock_ocr_text(pdf_path, is_pdf=True)
+                metrics.PAGES.inc(1, 'mock')
 
-            combined_text = self._clean_text(combined_text)
+            with metrics.timed('clean', timings):
+                combined_text = self._clean_text(combined_text)
 
-            return {
+            result = {
                 'success': True,
                 'text': combined_text,
-                'error': None
+                'error': None,
+                'pages_processed': pages_processed,
+                'total_pages': total_pages,
+                'timings': timings
             }
+            if structured:
+                result['data'] = document
+            if partial or failed_pages:
+                result['partial'] = True
+            if failed_pages:
+                result['failed_pages'] = failed_pages
+            return result
 
         except Exception as e:
             self.logger.error(f"PDF processing error: {str(e)}")
@@ -244,19 +809,495 @@ class OCRProcessor:
                 'error': error_message,
                 'text': ''
             }
-    
+        finally:
+            if pdf_dir:
+                shutil.rmtree(pdf_dir, ignore_errors=True)
+
+    def _gather_pages(self, page_results, all_text, document, pages_done, pages_total, progress_callback=None,
+                      page_callback=None, deadline=None, failed_pages=None):
+        """
+        Add (page_number, output, page timings) results to a document's text,
+        and to its structured document when one is given, reporting progress.
+
+        Pages that failed or timed out (None output) count as done for
+        progress, and their numbers are appended to failed_pages if given.
+        Stops once the deadline is cancelled or expires. page_results is
+        closed either way, which cancels pages not yet started.
+
+        Returns:
+            tuple: (pages done so far, whether pages of pages_total were left out)
+        """
+        try:
+            for page_number, output, page_timings in page_results:
+                pages_done += 1
+                if output is None and failed_pages is not None:
+                    failed_pages.append(page_number)
+                page_text = output
+                if document is not None and output is not None:
+                    structure.add_page(document, page_number, output['width'], output['height'], output['words'])
+                    page_text = structure.words_to_text(output['words'])
+                if page_text and page_text.strip():
+                    all_text.append(f"--- Page {page_number} ---\n{page_text}")
+                if progress_callback:
+                    progress_callback(pages_done, pages_total)
+                if page_callback:
+                    page_callback({
+                        'page': page_number,
+                        'text': self._clean_text(page_text or ''),
+                        'pages_done': pages_done,
+                        'pages_total': pages_total,
+                        'timings': page_timings
+                    })
+
+                if deadline is not None and (deadline.cancelled() or deadline.expired()):
+                    return pages_done, pages_done < pages_total
+            return pages_done, False
+        finally:
+            page_results.close()
+
+    def _assemble_searchable_pdf(self, pdf_path, pdf_dir, first_page, last_page, output_path, poppler_path,
+                                 bare_pages=()):
+        """
+        Join per-page searchable PDFs into output_path with Poppler's pdfunite.
+
+        bare_pages are pages expected to have no page PDF: text layer pages,
+        and pages that failed or were never reached, which the result already
+        reports as partial. They are copied from the source PDF with
+        pdfseparate, or left out when there is no source PDF (multi-frame
+        images). Any other page without a page PDF raises, rather than ship
+        a page without its text layer. Pages are merged from disk, so no page
+        PDF is held in memory.
+        """
+        page_files = []
+        for page_number in range(first_page, last_page + 1):
+            page_file = os.path.join(pdf_dir, f'page_{page_number:06d}.pdf')
+            if not os.path.exists(page_file):
+                if page_number not in bare_pages:
+                    raise RuntimeError(f"Tesseract wrote no searchable PDF for page {page_number}")
+                if pdf_path is None:
+                    self.logger.warning(f"Page {page_number} was not OCR'd and is left out of the searchable PDF")
+                    continue
+                self._run_poppler('pdfseparate', ['-f', str(page_number), '-l', str(page_number), pdf_path, page_file],
+                                  poppler_path)
+            page_files.append(page_file)
+
+        if not page_files:
+            raise RuntimeError('No page could be OCR\'d for the searchable PDF')
+
+        if len(page_files) == 1:
+            shutil.move(page_files[0], output_path)
+        else:
+            self._run_poppler('pdfunite', page_files + [output_path], poppler_path)
+
+    def _run_poppler(self, tool, args, poppler_path):
+        """Run a Poppler command line tool, raising on failure.
+
+        Returns:
+            CompletedProcess: With the tool's captured stdout and stderr
+        """
+        command = os.path.join(poppler_path, tool) if poppler_path else tool
+        return subprocess.run([command] + args, capture_output=True, check=True,
+                              timeout=current_app.config.get('OCR_TIMEOUT', 30))
+
+    def _process_template(self, file_path, file_ext, language, template, progress_callback=None, data=None,
+                          deadline=None):
+        """OCR only the zones of a template, concurrently on the page pool, into a field -> value map."""
+        deadline = deadline or _Deadline(0, 0)
+        timings = {}
+        page_zones = defaultdict(list)
+        for field, zone in template['zones'].items():
+            page_zones[zone['page']].append((field, zone))
+
+        futures = {}
+        try:
+            try:
+                # Crop and queue every zone of a page, then let the page image go
+                for page_number, image in self._iter_template_pages(file_path, file_ext, sorted(page_zones), data, timings,
+                                                                    deadline):
+                    for field, zone in page_zones[page_number]:
+                        crop = image.crop(zones.zone_box(zone, image.width, image.height))
+                        futures[field] = self._submit_page(crop, zone['language'] or language, zones.zone_config(zone),
+                                                           timeout=deadline.page_timeout())
+                    metrics.PAGES.inc(1, 'ocr')
+                    del image
+
+                fields = {}
+                for done, field in enumerate(template['zones'], 1):
+                    fields[field] = self._collect_zone(field, futures.get(field), timings, deadline)
+                    if progress_callback:
+                        progress_callback(done, len(template['zones']))
+            finally:
+                for future in futures.values():
+                    future.cancel()
+
+            return {
+                'success': True,
+                'text': zones.fields_to_text(fields),
+                'fields': fields,
+                'error': None,
+                'timings': timings
+            }
+
+        except Exception as e:
+            self.logger.error(f"Template OCR error: {str(e)}")
+            return {
+                'success': False,
+                'error': f'Template OCR failed: {str(e)}',
+                'text': ''
+            }
+
+    def _collect_zone(self, field, future, timings=None, deadline=None):
+        """Wait for one zone's text; zones that failed, timed out or lie past the last page read as ''."""
+        if future is None:
+            self.logger.warning(f"Template zone {field} is not on any page of the document")
+            return ''
+        try:
+            text, zone_timings, _ = future.result(deadline.remaining() if deadline else None)
+            _record_timings(timings, zone_timings)
+            return self._clean_text(text)
+        except Exception as e:
+            self.logger.warning(f"Error processing template zone {field}: {str(e)}")
+            return ''
+
+    def _iter_template_pages(self, file_path, file_ext, page_numbers, data=None, timings=None, deadline=None):
+        """Yield (page_number, image) for the given pages of an image or PDF, one page at a time.
+
+        PDF pages that cannot be rendered within the deadline's page limit are
+        skipped, so their zones read as ''.
+        """
+        deadline = deadline or _Deadline(0, 0)
+        if file_ext != '.pdf':
+            with Image.open(io.BytesIO(data) if data is not None else file_path) as img:
+                frames = ImageSequence.Iterator(img)
+                frame_count = getattr(img, 'n_frames', 1) if file_ext in MULTI_FRAME_EXTENSIONS else 1
+                for page_number in page_numbers:
+                    if page_number <= frame_count:
+                        with metrics.timed('decode', timings):
+                            image = self._decode_image(frames[page_number - 1])
+                        yield page_number, image
+            return
+
+        pdf_path = file_path
+        if data is not None:
+            # Poppler needs a file path; see _process_pdf_bytes
+            fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+        try:
+            if not get_capabilities()['poppler']['available']:
+                raise pdf2image.exceptions.PDFInfoNotInstalledError('Poppler was not found when probing capabilities')
+            poppler_path = current_app.config.get('POPPLER_PATH') or None
+
+            with metrics.timed('pdf_info', timings):
+                pdf_info = pdf2image.pdfinfo_from_path(pdf_path, poppler_path=poppler_path,
+                                                       timeout=deadline.page_timeout() or None)
+                total_pages = int(pdf_info.get('Pages', 1))
+                page_sizes = self._get_page_sizes(
+                    pdf_path, page_numbers[0], min(page_numbers[-1], total_pages), poppler_path
+                )
+            page_plan = [
+                (page_number, self._choose_dpi(page_sizes.get(page_number)), None)
+                for page_number in page_numbers if page_number <= total_pages
+            ]
+            for page_number, image, _ in self._iter_pdf_pages(pdf_path, page_plan, poppler_path, timings, deadline):
+                if image is not None:
+                    yield page_number, image.convert('RGB')
+        finally:
+            if data is not None:
+                os.remove(pdf_path)
+
+    def _plan_pdf_pages(self, pdf_path, page_sizes, first_page, last_page, poppler_path, use_text_layer=True):
+        """
+        Decide how each page in a range will be read.
+
+        Returns:
+            list: (page_number, dpi, text) tuples. Born-digital pages carry their
+                embedded text and are never rasterized; image-only pages get a
+                DPI chosen from their physical size.
+        """
+        text_layer = {}
+        if use_text_layer and current_app.config.get('PDF_USE_TEXT_LAYER', True):
+            text_layer = self._extract_text_layer(pdf_path, first_page, last_page, poppler_path)
+        min_chars = current_app.config.get('PDF_TEXT_LAYER_MIN_CHARS', 50)
+
+        plan = []
+        for page_number in range(first_page, last_page + 1):
+            text = text_layer.get(page_number, '')
+            if len(text.strip()) >= min_chars:
+                plan.append((page_number, None, text))
+            else:
+                plan.append((page_number, self._choose_dpi(page_sizes.get(page_number)), None))
+        return plan
+
+    def _get_page_sizes(self, pdf_path, first_page, last_page, poppler_path):
+        """Read page sizes in points for a page range, keyed by page number.
+
+        pdf2image's pdfinfo_from_path takes no page range, so pdfinfo is run
+        directly. Pages whose size cannot be read are rendered at PDF_DPI.
+        """
+        if last_page < first_page:
+            return {}
+        try:
+            completed = self._run_poppler('pdfinfo', ['-f', str(first_page), '-l', str(last_page), pdf_path],
+                                          poppler_path)
+        except (OSError, subprocess.SubprocessError) as e:
+            self.logger.warning(f"Page size probe failed, rendering at PDF_DPI: {str(e)}")
+            return {}
+
+        sizes = {}
+        for line in completed.stdout.decode('utf-8', errors='replace').splitlines():
+            # 'Page    3 size: 612 x 792 pts (letter)'
+            match = re.match(r'Page\s+(\d+)\s+size:\s*([\d.]+)\s*x\s*([\d.]+)', line)
+            if match:
+                sizes[int(match.group(1))] = (float(match.group(2)), float(match.group(3)))
+        return sizes
+
+    def _choose_dpi(self, page_size):
+        """Pick a rasterization DPI that renders a page to about PDF_TARGET_PIXELS."""
+        config = current_app.config
+        if not page_size:
+            return config.get('PDF_DPI', 300)
+
+        area_sq_in = (page_size[0] / 72) * (page_size[1] / 72)
+        dpi = math.sqrt(config.get('PDF_TARGET_PIXELS', 8_400_000) / area_sq_in)
+        return int(max(config.get('PDF_MIN_DPI', 150), min(config.get('PDF_MAX_DPI', 400), dpi)))
+
+    def _extract_text_layer(self, pdf_path, first_page, last_page, poppler_path):
+        """Extract embedded text for a page range with pdftotext, keyed by page number."""
+        command = os.path.join(poppler_path, 'pdftotext') if poppler_path else 'pdftotext'
+        try:
+            completed = subprocess.run(
+                [command, '-f', str(first_page), '-l', str(last_page), '-enc', 'UTF-8', pdf_path, '-'],
+                capture_output=True,
+                timeout=current_app.config.get('OCR_TIMEOUT', 30),
+                check=True
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            self.logger.warning(f"Text layer probe failed, OCR'ing all pages: {str(e)}")
+            return {}
+
+        # pdftotext ends every page with a form feed
+        page_texts = completed.stdout.decode('utf-8', errors='replace').split('\f')
+        return {
+            first_page + i: text
+            for i, text in enumerate(page_texts[:last_page - first_page + 1])
+        }
+
+    def _iter_pdf_pages(self, pdf_path, page_plan, poppler_path, timings=None, deadline=None):
+        """Yield (page_number, image, text) for a page plan, rendering one page per Poppler call.
+
+        Each render is stopped at the deadline's page limit; such pages are
+        yielded with neither image nor text, and _ocr_pages reports them as
+        timed out.
+        """
+        deadline = deadline or _Deadline(0, 0)
+        for page_number, dpi, text in page_plan:
+            if text is not None:
+                yield page_number, None, text
+                continue
+
+            try:
+                with metrics.timed('rasterize', timings):
+                    images = pdf2image.convert_from_path(
+                        pdf_path,
+                        dpi=dpi,
+                        first_page=page_number,
+                        last_page=page_number,
+                        poppler_path=poppler_path,
+                        timeout=deadline.page_timeout() or None
+                    )
+            except pdf2image.exceptions.PDFPopplerTimeoutError:
+                yield page_number, None, None
+                continue
+            if images:
+                # Pop, and drop the local after the yield, so the generator frame
+                # keeps no reference once the consumer is done with the page
+                image = images.pop()
+                image.info['dpi'] = (dpi, dpi)
+                yield page_number, image, None
+                del image
+
+    def _get_render_window(self, page_plan, page_sizes):
+        """Number of rasterized pages one request may hold in memory at once."""
+        budget = current_app.config.get('PDF_RENDER_MEMORY_MB', 128) * 1024 * 1024
+
+        # RGB bytes of the largest page that will be rendered; assume letter size if unknown
+        page_bytes = 1
+        for page_number, dpi, text in page_plan:
+            if text is None:
+                width_pts, height_pts = page_sizes.get(page_number) or (612.0, 792.0)
+                pixels = (width_pts / 72 * dpi) * (height_pts / 72 * dpi)
+                page_bytes = max(page_bytes, int(pixels * 3))
+        return max(1, budget // page_bytes)
+
+    def _ocr_pages(self, pages, language, window, timings=None, structured=False, pdf_dir=None, detections=None,
+                   deadline=None):
+        """
+        OCR (page_number, image, text) items on the page pool, yielding
+        (page_number, text, page timings) in page order.
+
+        Items that already carry text (e.g. a PDF text layer) skip OCR, and
+        items with neither image nor text (pages that could not be rendered in
+        time) are reported as timed out. No more
+        than `window` pages are queued at once, so the page source is only
+        advanced as earlier pages finish. Failed pages are logged and yielded
+        with None text. Per-stage seconds are summed into `timings` if given.
+        When structured, OCR'd pages yield _ocr_page's structured output instead of text.
+        With pdf_dir, each OCR'd page also writes its searchable PDF there as page_NNNNNN.pdf.
+        With detections (the 'auto' language), pages reuse earlier detections
+        by page number and record their own into it. A deadline limits each
+        page's Tesseract run and how long results are waited for. With
+        OCR_PAGE_DEDUP, pages that look like an earlier page reuse its output.
+        """
+        config = self._get_tesseract_config()
+        # Searchable PDFs need every page's own PDF, so they are never deduplicated
+        page_cache = get_page_cache() if not pdf_dir else None
+        signature = self._get_dedup_signature(language, config, structured) if page_cache else None
+        pending = deque()
+
+        try:
+            for page_number, image, text in pages:
+                dedup_key = None
+                if text is not None:
+                    future = Future()
+                    future.set_result((text, {}, None))
+                elif image is None:
+                    future = Future()
+                    future.set_exception(TimeoutError(f'Rendering page {page_number} did not finish in time'))
+                else:
+                    cached = None
+                    if page_cache is not None:
+                        started = time.perf_counter()
+                        dedup_key = (f'{signature}|{image.width / image.height:.1f}', dhash(image, page_cache.hash_size))
+                        cached = page_cache.get(*dedup_key)
+                        dedup_seconds = time.perf_counter() - started
+
+                    if cached is not None:
+                        dedup_key = None
+                        future = Future()
+                        future.set_result((cached[0], {'dedup': dedup_seconds}, cached[1]))
+                    else:
+                        if page_cache is not None:
+                            metrics.record_stage('dedup', dedup_seconds, timings)
+                        pdf_page_path = os.path.join(pdf_dir, f'page_{page_number:06d}.pdf') if pdf_dir else None
+                        detected = detections.get(page_number) if detections is not None else None
+                        future = self._submit_page(image, language, config, structured, pdf_page_path, detected,
+                                                   deadline.page_timeout() if deadline else 0)
+                pending.append((page_number, future, dedup_key))
+                del image
+                if len(pending) >= window:
+                    yield self._collect_page(*pending.popleft(), timings, detections, deadline)
+
+            while pending:
+                yield self._collect_page(*pending.popleft(), timings, detections, deadline)
+        finally:
+            # Consumer stopped early or rendering failed; drop queued pages
+            for _, future, _ in pending:
+                future.cancel()
+
+    def _collect_page(self, page_number, future, dedup_key=None, timings=None, detections=None, deadline=None):
+        """Wait for one page's OCR result, isolating per-page failures.
+
+        With a dedup_key of (signature, page hash), the OCR'd page is added
+        to the duplicate page cache.
+
+        Returns:
+            tuple: (page_number, text or None, the page's {stage name: seconds})
+        """
+        try:
+            text, page_timings, page_info = future.result(deadline.remaining() if deadline else None)
+            _record_timings(timings, page_timings)
+            if detections is not None and page_info:
+                detections[page_number] = page_info
+            if dedup_key is not None:
+                get_page_cache().set(*dedup_key, (text, page_info))
+            if 'ocr' in page_timings:
+                metrics.PAGES.inc(1, 'ocr')
+            else:
+                metrics.PAGES.inc(1, 'dedup' if 'dedup' in page_timings else 'text_layer')
+            return page_number, text, page_timings
+        except (TimeoutError, FutureTimeoutError) as e:
+            # Tesseract was stopped at the page limit, or the document ran out of time waiting
+            future.cancel()
+            self.logger.warning(f"PDF page {page_number} timed out: {str(e) or 'document time limit reached'}")
+            metrics.PAGES.inc(1, 'timeout')
+            return page_number, None, {}
+        except Exception as e:
+            self.logger.warning(f"Error processing PDF page {page_number}: {str(e)}")
+            metrics.PAGES.inc(1, 'failed')
+            return page_number, None, {}
+
+    def _get_dedup_signature(self, language, config, structured=False):
+        """Everything besides the page image that affects a page's OCR output, for the duplicate page cache."""
+        preprocess_settings = self._get_preprocess_settings(structured)
+        return '|'.join([
+            language,
+            config,
+            current_app.config.get('OCR_ENGINE', 'pytesseract'),
+            'structured' if structured else 'text',
+            repr(sorted(preprocess_settings.items())) if preprocess_settings else 'raw'
+        ])
+
     def _get_tesseract_config(self):
-        """Get Tesseract configuration string."""
+        """Get Tesseract configuration string.
+
+        OCR_TIMEOUT is not a Tesseract option; it is enforced per call by the engines.
+        """
         # Basic configuration for better accuracy
-        config = '--oem 3 --psm 6'  # OCR Engine Mode 3, Page Segmentation Mode 6
-        
-        # Add timeout if configured
-        if hasattr(current_app.config, 'OCR_TIMEOUT'):
-            timeout = current_app.config['OCR_TIMEOUT']
-            config += f' -c tessedit_do_invert=0 -c timeout={timeout}'
-        
-        return config
+        return '--oem 3 --psm 6'  # OCR Engine Mode 3, Page Segmentation Mode 6
     
+    def estimate_pages(self, file_path, data=None, first_page=None, last_page=None, template=None, **options):
+        """
+        Cheaply estimate how many pages process_file will OCR, for admission control.
+        Takes the same options as process_file; only the page range and template matter.
+
+        PDFs are not opened with Poppler; the page count is read from the
+        page tree in the raw bytes. Documents whose page tree is compressed
+        count as PDF_CHUNK_PAGES pages unless a full page range is given.
+        Multi-frame images count their frames from the file headers, without
+        decoding any.
+        """
+        file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext != '.pdf' and file_ext not in MULTI_FRAME_EXTENSIONS:
+            return 1
+        if template:
+            return len({zone['page'] for zone in template['zones'].values()})
+
+        max_pages = current_app.config.get('PDF_MAX_PAGES', 200)
+        first_page = first_page or 1
+        if last_page:
+            return max(1, min(last_page - first_page + 1, max_pages))
+
+        if file_ext != '.pdf':
+            try:
+                with Image.open(io.BytesIO(data) if data is not None else file_path) as img:
+                    total_pages = getattr(img, 'n_frames', 1)
+            except Exception:
+                return 1  # Unreadable images fail in process_file
+        else:
+            if data is None:
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+            counts = [int(count) for count in re.findall(rb'/Count\s+(\d+)', data)]
+            total_pages = max(counts) if counts else current_app.config.get('PDF_CHUNK_PAGES', 20)
+        return max(1, min(total_pages - first_page + 1, max_pages))
+
+    def get_cache_key(self, file_hash, language, options=None):
+        """Build the result cache key for a file hash, language and process_file options."""
+        if self._ensure_tesseract_configured():
+            signature = self._get_tesseract_config()
+        else:
+            # Never serve demonstration output once real OCR is available
+            signature = 'mock'
+        if options:
+            signature += '|' + '|'.join(f"{name}={value}" for name, value in sorted(options.items()))
+        # Changing any of these changes the text, so it must not reuse stale results
+        signature += '|' + '|'.join(f"{name}={current_app.config.get(name)}" for name in OUTPUT_SETTINGS)
+        preprocess_settings = self._get_preprocess_settings(bool(options and options.get('structured')))
+        if preprocess_settings:
+            signature += '|preprocess=' + repr(sorted(preprocess_settings.items()))
+        return make_cache_key(file_hash, language, signature)
+
     def _clean_text(self, text):
         """Clean and normalize extracted text."""
         if not text:
@@ -275,17 +1316,8 @@ class OCRProcessor:
         return cleaned_text.strip()
     
     def get_available_languages(self):
-        """Get list of available Tesseract languages."""
-        try:
-            if self._ensure_tesseract_configured():
-                languages = pytesseract.get_languages()
-                return languages
-            else:
-                # Return mock languages for demonstration
-                return ['eng', 'spa', 'fra', 'deu']
-        except Exception as e:
-            self.logger.error(f"Error getting available languages: {str(e)}")
-            return ['eng']  # Default fallback
+        """Get list of available Tesseract languages (mock languages in demonstration mode)."""
+        return get_capabilities()['languages']
 
     def _mock_ocr_text(self, file_path, is_pdf=False):
         """Generate mock OCR text for demonstration when Tesseract is not available."""
@@ -308,8 +1340,9 @@ To enable real OCR functionality:
 Additional pages would appear here with their extracted text content.
 
 The OCR Web Application supports:
-- Multiple image formats (JPEG, PNG)
-- PDF documents (up to 10 pages)
+- Multiple image formats (JPEG, PNG, TIFF, WebP, BMP, GIF)
+- Multi-page TIFF faxes, one page per frame
+- PDF documents (multi-page, with optional page ranges)
 - Multi-language text recognition
 - High accuracy text extraction"""
         else:
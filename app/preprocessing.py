@@ -0,0 +1,183 @@
+"""
+Image preprocessing applied before OCR.
+
+Large colour photos are reduced to a small grayscale or binary image with
+vectorized NumPy/Pillow operations so Tesseract has less to read. Every
+stage is optional and reports how long it took.
+"""
+
+import time
+import logging
+from PIL import Image
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGES = ('grayscale', 'downscale', 'deskew', 'binarize', 'crop')
+
+# Stages that resize, rotate or crop, changing pixel coordinates
+GEOMETRY_STAGES = ('downscale', 'deskew', 'crop')
+
+# Longest side of the thumbnail used to estimate text height and skew
+ANALYSIS_SIZE = 1000
+
+def _otsu_threshold(gray):
+    """Global Otsu threshold of a uint8 array."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    mean_bg = np.cumsum(hist * levels)
+    mean_total = mean_bg[-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mean_total * weight_bg / weight_bg[-1] - mean_bg) ** 2 / (weight_bg * weight_fg)
+    return int(np.nanargmax(between))
+
+def _ink_mask(image):
+    """Boolean array marking dark (ink) pixels of a small analysis copy."""
+    thumb = image.convert('L')
+    thumb.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    gray = np.asarray(thumb)
+    if gray.min() == gray.max():
+        return np.zeros(gray.shape, dtype=bool), image.width / thumb.width  # Blank page
+    return gray <= _otsu_threshold(gray), image.width / thumb.width
+
+def grayscale(image, settings):
+    """Drop colour; Tesseract only uses luminance."""
+    return image if image.mode == 'L' else image.convert('L')
+
+def downscale(image, settings):
+    """Shrink so the median text line is about PREPROCESS_TARGET_TEXT_HEIGHT pixels tall."""
+    mask, scale = _ink_mask(image)
+
+    # Rows containing ink form bands, one per text line
+    inked = mask.mean(axis=1) > 0.01
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], inked.view(np.int8), [0]))))
+    heights = edges[1::2] - edges[::2]
+    if heights.size == 0:
+        return image
+
+    line_height = float(np.median(heights)) * scale
+    target = settings.get('target_text_height', 32)
+    if line_height <= target * 1.5:
+        return image  # Never upscale, and skip negligible reductions
+
+    factor = target / line_height
+    size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+    resized = image.resize(size, Image.Resampling.BOX)
+
+    dpi = image.info.get('dpi')
+    if dpi:
+        # resize() copies info unchanged; Tesseract reads the DPI to judge text size
+        resized.info['dpi'] = (dpi[0] * size[0] / image.width, dpi[1] * size[1] / image.height)
+    return resized
+
+def deskew(image, settings):
+    """Rotate by the angle that makes horizontal ink projections sharpest."""
+    mask, _ = _ink_mask(image)
+    if not mask.any():
+        return image
+
+    max_angle = settings.get('max_skew', 10.0)
+    mask_image = Image.fromarray(mask.astype(np.uint8) * 255)
+
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + 0.01, 0.5):
+        rotated = np.asarray(mask_image.rotate(angle, resample=Image.Resampling.NEAREST))
+        profile = rotated.sum(axis=1, dtype=np.float64)
+        score = float(np.var(profile))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+
+    if abs(best_angle) < 0.25:
+        return image
+
+    fill = 255 if image.mode == 'L' else 'white'
+    return image.rotate(best_angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=fill)
+
+def binarize(image, settings):
+    """Sauvola adaptive threshold computed with integral images."""
+    gray = np.asarray(image.convert('L'), dtype=np.float64)
+    window = settings.get('binarize_window', 31) | 1  # Odd window size
+    k = settings.get('binarize_k', 0.2)
+    half = window // 2
+
+    padded = np.pad(gray, half + 1, mode='edge')
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    integral_sq = (padded ** 2).cumsum(axis=0).cumsum(axis=1)
+
+    height, width = gray.shape
+    rows = slice(window, window + height)
+    cols = slice(window, window + width)
+    rows_lo = slice(0, height)
+    cols_lo = slice(0, width)
+
+    def window_sum(table):
+        return table[rows, cols] - table[rows_lo, cols] - table[rows, cols_lo] + table[rows_lo, cols_lo]
+
+    area = window * window
+    mean = window_sum(integral) / area
+    std = np.sqrt(np.maximum(window_sum(integral_sq) / area - mean ** 2, 0))
+    threshold = mean * (1 + k * (std / 128 - 1))
+
+    binary = np.where(gray > threshold, 255, 0).astype(np.uint8)
+    return Image.fromarray(binary, mode='L')
+
+def crop(image, settings):
+    """Trim empty borders around the inked area."""
+    mask, scale = _ink_mask(image)
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0 or cols.size == 0:
+        return image
+
+    margin = settings.get('crop_margin', 10)
+    box = (
+        max(0, int(cols[0] * scale) - margin),
+        max(0, int(rows[0] * scale) - margin),
+        min(image.width, int((cols[-1] + 1) * scale) + margin),
+        min(image.height, int((rows[-1] + 1) * scale) + margin)
+    )
+    return image.crop(box)
+
+STAGES = {
+    'grayscale': grayscale,
+    'downscale': downscale,
+    'deskew': deskew,
+    'binarize': binarize,
+    'crop': crop
+}
+
+def preprocess(image, settings):
+    """
+    Run the configured preprocessing stages on an image.
+
+    Args:
+        image (PIL.Image.Image): Page or photo to prepare for OCR
+        settings (dict): 'stages' to run in order plus per-stage options
+
+    Returns:
+        tuple: (processed image, {stage name: seconds})
+    """
+    timings = {}
+    if not NUMPY_AVAILABLE:
+        logger.warning("NumPy is not installed; skipping image preprocessing")
+        return image, timings
+
+    for name in settings.get('stages', DEFAULT_STAGES):
+        stage = STAGES.get(name)
+        if stage is None:
+            logger.warning(f"Unknown preprocessing stage: {name}")
+            continue
+
+        started = time.perf_counter()
+        image = stage(image, settings)
+        timings[f'preprocess_{name}'] = time.perf_counter() - started
+
+    return image, timings
@@ -1,9 +1,26 @@
 import os
+import re
 import json
-from flask import Blueprint, render_template, request, jsonify, send_file, current_app, flash, redirect, url_for
+import uuid
+import queue
+import shutil
+import zipfile
+import threading
+from concurrent.futures import as_completed, wait, FIRST_COMPLETED
+from flask import Blueprint, render_template, request, jsonify, send_file, current_app, flash, redirect, url_for, Response, stream_with_context
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
-from app.utils import allowed_file, validate_file_type, generate_unique_filename, cleanup_old_files, format_file_size, sanitize_text
+from app.utils import allowed_file, validate_file_buffer, MIME_HEADER_SIZE, generate_unique_filename, format_file_size, sanitize_text, build_result_payload
 from app.ocr_processor import OCRProcessor
+from app.cache import get_cache, hash_stream
+from app.dedup import get_page_cache
+from app.jobs import get_job_queue
+from app.janitor import get_janitor
+from app.capabilities import get_capabilities
+from app.structure import EXPORT_FORMATS, export_document
+from app.zones import get_template, get_templates
+from app.admission import AdmissionError, get_admission, check_rate_limit
+from app import metrics
 import tempfile
 import io
 
@@ -13,98 +30,782 @@ main = Blueprint('main', __name__)
 # Initialize OCR processor
 ocr_processor = OCRProcessor()
 
+@main.before_request
+def track_request_start():
+    """Count the request as in flight."""
+    metrics.IN_FLIGHT.inc(1, request.endpoint)
+
+@main.after_request
+def track_request_status(response):
+    """Count the finished request by endpoint and status code."""
+    metrics.REQUESTS.inc(1, request.endpoint, response.status_code)
+    return response
+
+@main.teardown_request
+def track_request_end(error=None):
+    """Runs after streamed responses finish, so batch requests stay in flight until done."""
+    metrics.IN_FLIGHT.dec(1, request.endpoint)
+
+def _wants_timings():
+    """Whether the client opted in to per-request stage timings."""
+    if current_app.config.get('EXPOSE_TIMINGS', False):
+        return True
+    return request.values.get('timings', '').lower() in ('1', 'true', 'yes')
+
+def _add_result_timings(timings, result):
+    """Merge the stage timings reported by process_file into the request's timings."""
+    for stage, seconds in (result.get('timings') or {}).items():
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+def _with_timings(body, timings):
+    """Build a JSON response, adding stage timings when the client asked for them."""
+    if not _wants_timings():
+        return jsonify(body)
+    response = jsonify({
+        **body,
+        'timings': {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+    })
+    response.headers['Server-Timing'] = metrics.format_server_timing(timings)
+    return response
+
 @main.route('/')
 def index():
     """Main page with upload form."""
-    cleanup_old_files()  # Clean up old files on each request
     return render_template('index.html')
 
+def _admission_error_response(error):
+    """Turn away work that was not admitted, telling the client when to retry."""
+    metrics.ADMISSION_REJECTED.inc(1, error.status)
+    response = jsonify({
+        'success': False,
+        'error': str(error)
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status
+
+def _get_uploaded_file():
+    """Get the uploaded file from the request, or an error response."""
+    # Check if file was uploaded
+    if 'file' not in request.files:
+        return None, (jsonify({
+            'success': False,
+            'error': 'No file selected'
+        }), 400)
+    
+    file = request.files['file']
+    
+    # Check if file was actually selected
+    if file.filename == '':
+        return None, (jsonify({
+            'success': False,
+            'error': 'No file selected'
+        }), 400)
+    
+    # Validate file extension
+    if not allowed_file(file.filename):
+        return None, (jsonify({
+            'success': False,
+            'error': f'File type not allowed. Supported formats: {", ".join(current_app.config["ALLOWED_EXTENSIONS"])}'
+        }), 400)
+    
+    return file, None
+
+def _stage_upload(file, timings=None):
+    """Validate an upload and stage it for OCR.
+
+    Uploads up to IN_MEMORY_UPLOAD_MAX_BYTES are read straight from the
+    request stream and never written to the upload folder; larger ones are
+    spooled to disk.
+
+    Returns:
+        tuple: (file_path, data, None) on success or (None, None, error message).
+            data holds the file contents for in-memory uploads and is None for
+            files saved at file_path
+    """
+    # Generate unique filename
+    filename = generate_unique_filename(file.filename)
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    
+    limit = current_app.config.get('IN_MEMORY_UPLOAD_MAX_BYTES', 0)
+    with metrics.timed('save', timings):
+        file.stream.seek(0)
+        data = file.stream.read(max(limit + 1, MIME_HEADER_SIZE))
+    
+    # Validate file type using magic numbers from the header, before anything is written to disk
+    with metrics.timed('validate', timings):
+        valid = validate_file_buffer(data, file.filename)
+    if not valid:
+        return None, None, 'Invalid file type detected'
+    
+    if limit and len(data) <= limit:
+        metrics.UPLOAD_BYTES.inc(len(data))
+        current_app.logger.info(f"Processing file: {filename} ({format_file_size(len(data))}, in memory)")
+        return file_path, data, None
+    
+    # Too large to hold in memory: save file
+    with metrics.timed('save', timings):
+        file.stream.seek(0)
+        file.save(file_path)
+    get_janitor().track(file_path)  # Removed by the janitor if processing never finishes
+    
+    # Get file size for logging
+    file_size = os.path.getsize(file_path)
+    metrics.UPLOAD_BYTES.inc(file_size)
+    current_app.logger.info(f"Processing file: {filename} ({format_file_size(file_size)})")
+    
+    return file_path, None, None
+
+def _discard_upload(file_path, data, timings=None):
+    """Remove a staged upload from disk once it has been processed."""
+    if data is not None:
+        return  # Held in memory, nothing on disk
+    try:
+        with metrics.timed('cleanup', timings):
+            os.remove(file_path)
+    except Exception as e:
+        current_app.logger.warning(f"Failed to clean up file {os.path.basename(file_path)}: {str(e)}")
+
+def _get_output_format():
+    """Requested result format: 'text', 'pdf' or one of the structured EXPORT_FORMATS."""
+    return request.form.get('format', '').strip().lower() or 'text'
+
+def _get_ocr_options(allow_pdf=False):
+    """Read optional OCR options from the request form.
+
+    A searchable PDF ('pdf' format) is only accepted where allow_pdf is set;
+    the caller supplies the output path.
+
+    Returns:
+        tuple: (options dict for process_file, None) or (None, error message)
+    """
+    options = {}
+    
+    output_format = _get_output_format()
+    formats = ['text'] + (['pdf'] if allow_pdf else []) + list(EXPORT_FORMATS)
+    if output_format not in formats:
+        return None, f'format must be one of: {", ".join(formats)}'
+    if output_format in EXPORT_FORMATS:
+        options['structured'] = True
+    
+    template_name = request.form.get('template', '').strip()
+    if template_name:
+        template = get_template(template_name)
+        if template is None:
+            return None, f'Unknown template: {template_name}'
+        if output_format != 'text':
+            return None, 'template cannot be combined with a format'
+        options['template'] = template
+    for field in ('first_page', 'last_page'):
+        value = request.form.get(field, '').strip()
+        if not value:
+            continue
+        if not value.isdigit() or int(value) < 1:
+            return None, f'{field} must be a positive integer'
+        options[field] = int(value)
+    
+    if options.get('last_page', float('inf')) < options.get('first_page', 1):
+        return None, 'last_page must not be before first_page'
+    if 'template' in options and ('first_page' in options or 'last_page' in options):
+        return None, 'template zones set their own pages; first_page and last_page cannot be used'
+    
+    return options, None
+
+def _lookup_cache(file, language, options, timings=None):
+    """Look up an upload in the result cache.
+
+    The cache key covers only the contents, so the header is checked against
+    the file's extension first; a mismatch skips the cache and is rejected
+    when the upload is staged.
+
+    Returns:
+        tuple: (cache_key, cached payload or None); cache_key is None when caching
+            is disabled or the file type is invalid
+    """
+    cache = get_cache()
+    if cache is None:
+        return None, None
+    with metrics.timed('validate', timings):
+        file.stream.seek(0)
+        valid = validate_file_buffer(file.stream.read(MIME_HEADER_SIZE), file.filename)
+    if not valid:
+        return None, None
+    with metrics.timed('cache_lookup', timings):
+        cache_key = ocr_processor.get_cache_key(hash_stream(file.stream), language, options)
+        return cache_key, cache.get(cache_key)
+
 @main.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and OCR processing."""
     try:
-        # Check if file was uploaded
-        if 'file' not in request.files:
+        check_rate_limit(request.remote_addr)
+        
+        file, error_response = _get_uploaded_file()
+        if error_response:
+            return error_response
+        
+        # Get language parameter (default to English)
+        language = request.form.get('language', 'eng')
+        
+        options, error = _get_ocr_options(allow_pdf=True)
+        if error:
             return jsonify({
                 'success': False,
-                'error': 'No file selected'
+                'error': error
             }), 400
         
-        file = request.files['file']
+        timings = {}
+        
+        # Searchable PDFs come out of the OCR pass itself, so they are never served from the cache
+        pdf_id = None
+        if _get_output_format() == 'pdf':
+            pdf_id = uuid.uuid4().hex
+            options['searchable_pdf'] = _searchable_pdf_path(pdf_id)
+            cache_key, cached = None, None
+        else:
+            cache_key, cached = _lookup_cache(file, language, options, timings)
+        if cached is not None:
+            return _with_timings({
+                'success': True,
+                **cached,
+                **_export_payload(cached, file.filename),
+                'filename': file.filename,
+                'cached': True
+            }, timings)
         
-        # Check if file was actually selected
-        if file.filename == '':
+        file_path, data, error = _stage_upload(file, timings)
+        if error:
             return jsonify({
                 'success': False,
-                'error': 'No file selected'
+                'error': error
             }), 400
         
-        # Validate file extension
-        if not allowed_file(file.filename):
+        # Process file with OCR once there is capacity for its pages
+        try:
+            admission = get_admission()
+            with metrics.timed('admission', timings):
+                weight = admission.acquire(ocr_processor.estimate_pages(file_path, data, **options))
+            try:
+                result = ocr_processor.process_file(file_path, language, data=data, **options)
+            finally:
+                admission.release(weight)
+        finally:
+            # Clean up uploaded file
+            _discard_upload(file_path, data, timings)
+        _add_result_timings(timings, result)
+        
+        if pdf_id:
+            pdf_path = options['searchable_pdf']
+            if result['success'] and os.path.exists(pdf_path):
+                get_janitor().track(pdf_path)
+            elif result['success']:
+                result = {'success': False, 'error': 'Failed to generate searchable PDF'}
+            elif os.path.exists(pdf_path):
+                os.remove(pdf_path)  # Partial output
+        
+        # Return result
+        if result['success']:
+            with metrics.timed('sanitize', timings):
+                payload = build_result_payload(result)
+            if cache_key is not None and not result.get('partial'):
+                get_cache().set(cache_key, payload)
+            return _with_timings({
+                'success': True,
+                **payload,
+                **_export_payload(payload, file.filename),
+                **_searchable_pdf_payload(pdf_id, file.filename),
+                'filename': file.filename,
+                'cached': False
+            }, timings)
+        else:
             return jsonify({
                 'success': False,
-                'error': f'File type not allowed. Supported formats: {", ".join(current_app.config["ALLOWED_EXTENSIONS"])}'
-            }), 400
+                'error': result['error']
+            }), 500
+            
+    except AdmissionError as e:
+        return _admission_error_response(e)
+    except Exception as e:
+        current_app.logger.error(f"Upload processing error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'An unexpected error occurred during processing'
+        }), 500
+
+@main.route('/upload/stream', methods=['POST'])
+def upload_stream():
+    """OCR a file and stream per-page progress back as Server-Sent Events.
+    
+    Emits a `page` event as each page finishes, in page order, then one
+    `result` event shaped like the /upload response, or an `error` event.
+    Closing the connection cancels pages that have not started yet.
+    """
+    try:
+        check_rate_limit(request.remote_addr)
         
-        # Generate unique filename
-        filename = generate_unique_filename(file.filename)
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        file, error_response = _get_uploaded_file()
+        if error_response:
+            return error_response
         
-        # Save file
-        file.save(file_path)
+        language = request.form.get('language', 'eng')
+        options, error = _get_ocr_options()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
         
-        # Validate file type using magic numbers
-        if not validate_file_type(file_path):
-            os.remove(file_path)  # Clean up invalid file
+        cache_key, cached = _lookup_cache(file, language, options)
+        if cached is not None:
+            body = _sse('result', {'success': True, **cached, 'filename': file.filename, 'cached': True})
+            return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+        
+        file_path, data, error = _stage_upload(file)
+        if error:
             return jsonify({
                 'success': False,
-                'error': 'Invalid file type detected'
+                'error': error
             }), 400
         
-        # Get file size for logging
-        file_size = os.path.getsize(file_path)
-        current_app.logger.info(f"Processing file: {filename} ({format_file_size(file_size)})")
+        # Admit before streaming starts, so a busy server still answers with 503
+        try:
+            weight = get_admission().acquire(ocr_processor.estimate_pages(file_path, data, **options))
+        except AdmissionError:
+            _discard_upload(file_path, data)
+            raise
         
-        # Get language parameter (default to English)
-        language = request.form.get('language', 'eng')
+        events = queue.Queue()
+        cancel_event = threading.Event()
+        # A thread of its own rather than the job executor, whose jobs may be waiting for
+        # the capacity this stream holds; admission already bounds how many run at once
+        app = current_app._get_current_object()
+        
+        def run_stream():
+            with app.app_context():
+                _stream_file(file_path, data, file.filename, language, options, cache_key, weight, events, cancel_event)
+        
+        threading.Thread(target=run_stream, name='ocr-stream', daemon=True).start()
         
-        # Process file with OCR
-        result = ocr_processor.process_file(file_path, language)
+        keepalive = current_app.config.get('STREAM_KEEPALIVE_SECONDS', 15)
         
-        # Clean up uploaded file
+        def generate():
+            try:
+                while True:
+                    try:
+                        event = events.get(timeout=keepalive)
+                    except queue.Empty:
+                        # A comment line; writing it is how a closed connection is noticed
+                        yield ': keepalive\n\n'
+                        continue
+                    if event is None:
+                        return
+                    yield _sse(*event)
+            finally:
+                # Client went away (or the stream finished); stop starting new pages
+                cancel_event.set()
+        
+        return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
+    except AdmissionError as e:
+        return _admission_error_response(e)
+    except Exception as e:
+        current_app.logger.error(f"Stream upload error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'An unexpected error occurred during processing'
+        }), 500
+
+def _sse(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _stream_file(file_path, data, filename, language, options, cache_key, weight, events, cancel_event):
+    """OCR one file for /upload/stream on its own thread, putting (event, data) pairs on events."""
+    def on_page(page):
+        events.put(('page', {
+            'page': page['page'],
+            'text': sanitize_text(page['text']),
+            'pages_done': page['pages_done'],
+            'pages_total': page['pages_total'],
+            'timings': {stage: round(seconds * 1000, 3) for stage, seconds in page['timings'].items()}
+        }))
+    
+    try:
         try:
-            os.remove(file_path)
-        except Exception as e:
-            current_app.logger.warning(f"Failed to clean up file {filename}: {str(e)}")
+            result = ocr_processor.process_file(
+                file_path, language, data=data, page_callback=on_page, cancel_event=cancel_event, **options
+            )
+        finally:
+            get_admission().release(weight)
+            _discard_upload(file_path, data)
         
-        # Return result
         if result['success']:
+            payload = build_result_payload(result)
+            if cache_key is not None and not result.get('partial'):
+                get_cache().set(cache_key, payload)
+            events.put(('result', {'success': True, **payload, 'filename': filename, 'cached': False}))
+        else:
+            events.put(('error', {'success': False, 'error': result['error']}))
+    except Exception as e:
+        current_app.logger.error(f"Stream processing error: {str(e)}")
+        events.put(('error', {'success': False, 'error': 'An unexpected error occurred during processing'}))
+    finally:
+        events.put(None)
+
+def _export_payload(payload, filename, output_format=None):
+    """Render structured data in the requested TSV, hOCR or ALTO format, if any."""
+    output_format = output_format or _get_output_format()
+    if output_format in ('text', 'json') or 'data' not in payload:
+        return {}
+    return {
+        'format': output_format,
+        'export': export_document(payload['data'], output_format, filename)
+    }
+
+def _searchable_pdf_path(pdf_id):
+    """Where the searchable PDF with the given id is kept until the janitor expires it."""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], f'{pdf_id}_searchable.pdf')
+
+def _searchable_pdf_payload(pdf_id, filename):
+    """Download link for a searchable PDF produced by /upload, if any."""
+    if not pdf_id:
+        return {}
+    return {
+        'format': 'pdf',
+        'pdf_id': pdf_id,
+        'pdf_url': url_for('main.download_pdf', pdf_id=pdf_id, filename=filename)
+    }
+
+def _detach_upload(upload):
+    """Copy an upload into a temporary file owned by the caller, who must close it."""
+    stream = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    upload.stream.seek(0)
+    shutil.copyfileobj(upload.stream, stream)
+    stream.seek(0)
+    return FileStorage(stream=stream, filename=upload.filename, content_type=upload.content_type)
+
+def _iter_batch_files(uploads):
+    """Yield (file, error) pairs for each upload, expanding zip archives member by member."""
+    max_size = current_app.config['MAX_CONTENT_LENGTH']
+    max_zip_bytes = current_app.config.get('BATCH_MAX_ZIP_BYTES', 100 * 1024 * 1024)
+    
+    for upload in uploads:
+        if not upload.filename.lower().endswith('.zip'):
+            yield upload, None
+            continue
+        
+        try:
+            with zipfile.ZipFile(upload.stream) as archive:
+                members = [info for info in archive.infolist() if not info.is_dir()]
+                # zipfile never reads past a member's stated size, so the total is a true bound
+                if max_zip_bytes and sum(info.file_size for info in members) > max_zip_bytes:
+                    yield upload, f'Zip archive expands to more than {format_file_size(max_zip_bytes)}'
+                    continue
+                
+                for info in members:
+                    member_name = os.path.basename(info.filename)
+                    if info.file_size > max_size:
+                        yield FileStorage(filename=member_name), f'File too large. Maximum size allowed: {format_file_size(max_size)}'
+                        continue
+                    
+                    with archive.open(info) as member:
+                        yield FileStorage(stream=member, filename=member_name), None
+        except zipfile.BadZipFile:
+            yield upload, 'Invalid or corrupted zip archive'
+
+def _process_batch_file(file_path, data, filename, language, options, cache_key):
+    """OCR one staged batch file; runs on the batch executor."""
+    try:
+        # Already accepted with the batch, so wait for capacity rather than failing
+        with get_admission().admit(ocr_processor.estimate_pages(file_path, data, **options), background=True):
+            result = ocr_processor.process_file(file_path, language, data=data, **options)
+    finally:
+        _discard_upload(file_path, data)
+    
+    if not result['success']:
+        return {
+            'filename': filename,
+            'success': False,
+            'text': '',
+            'error': result['error']
+        }
+    
+    with metrics.timed('sanitize'):
+        payload = build_result_payload(result)
+    if cache_key is not None and not result.get('partial'):
+        get_cache().set(cache_key, payload)
+    
+    return {
+        'filename': filename,
+        'success': True,
+        **payload,
+        'error': None,
+        'cached': False
+    }
+
+@main.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    """OCR many files (or zip archives of files) and stream results back as NDJSON."""
+    try:
+        check_rate_limit(request.remote_addr)
+        
+        uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+        if not uploads:
+            return jsonify({
+                'success': False,
+                'error': 'No file selected'
+            }), 400
+        
+        language = request.form.get('language', 'eng')
+        options, error = _get_ocr_options()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        # Flask closes request files once this view returns, before the stream reads them
+        uploads = [_detach_upload(upload) for upload in uploads]
+        
+        max_files = current_app.config.get('BATCH_MAX_FILES', 500)
+        max_staged = max(1, current_app.config.get('BATCH_MAX_STAGED', 10))
+        job_queue = get_job_queue()
+        
+        def batch_result(future):
+            try:
+                return future.result()
+            except Exception as e:
+                current_app.logger.error(f"Batch processing error: {str(e)}")
+                return {
+                    'filename': None,
+                    'success': False,
+                    'text': '',
+                    'error': 'An unexpected error occurred during processing'
+                }
+        
+        def generate():
+            # Files are staged one at a time as earlier ones finish, so at most
+            # max_staged are held in memory or spooled to disk for this request
+            pending = set()
+            try:
+                for count, (file, error) in enumerate(_iter_batch_files(uploads), 1):
+                    if count > max_files:
+                        yield json.dumps({
+                            'filename': file.filename,
+                            'success': False,
+                            'text': '',
+                            'error': f'Batch limit of {max_files} files exceeded'
+                        }) + '\n'
+                        break
+                    
+                    if error is None and not allowed_file(file.filename):
+                        error = f'File type not allowed. Supported formats: {", ".join(current_app.config["ALLOWED_EXTENSIONS"])}'
+                    
+                    if error is None:
+                        cache_key, cached = _lookup_cache(file, language, options)
+                        if cached is not None:
+                            yield json.dumps({
+                                'filename': file.filename,
+                                'success': True,
+                                **cached,
+                                'error': None,
+                                'cached': True
+                            }) + '\n'
+                            continue
+                        
+                        while len(pending) >= max_staged:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                yield json.dumps(batch_result(future)) + '\n'
+                        
+                        file_path, data, error = _stage_upload(file)
+                    
+                    if error is not None:
+                        yield json.dumps({
+                            'filename': file.filename,
+                            'success': False,
+                            'text': '',
+                            'error': error
+                        }) + '\n'
+                        continue
+                    
+                    pending.add(job_queue.run_task(
+                        _process_batch_file, file_path, data, file.filename, language, options, cache_key
+                    ))
+                
+                for future in as_completed(pending):
+                    yield json.dumps(batch_result(future)) + '\n'
+                pending = set()
+            finally:
+                # Client went away; files not started are left to the janitor
+                for future in pending:
+                    future.cancel()
+                for upload in uploads:
+                    upload.close()
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except AdmissionError as e:
+        return _admission_error_response(e)
+    except Exception as e:
+        current_app.logger.error(f"Batch upload error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'An unexpected error occurred during processing'
+        }), 500
+
+@main.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a file for background OCR and return its job id immediately."""
+    try:
+        check_rate_limit(request.remote_addr)
+        
+        file, error_response = _get_uploaded_file()
+        if error_response:
+            return error_response
+        
+        language = request.form.get('language', 'eng')
+        options, error = _get_ocr_options()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        job_queue = get_job_queue()
+        
+        # Cached results complete immediately
+        cache_key, cached = _lookup_cache(file, language, options)
+        if cached is not None:
+            job_id = job_queue.create_finished(file.filename, language, cached, _get_output_format())
             return jsonify({
                 'success': True,
-                'text': sanitize_text(result['text']),
-                'filename': file.filename
-            })
-        else:
+                'job_id': job_id,
+                'status': 'finished'
+            }), 202
+        
+        file_path, data, error = _stage_upload(file)
+        if error:
             return jsonify({
                 'success': False,
-                'error': result['error']
-            }), 500
-            
+                'error': error
+            }), 400
+        
+        job_id = job_queue.submit(
+            ocr_processor, file_path, file.filename, language, cache_key, data, options, _get_output_format()
+        )
+        if job_id is None:
+            _discard_upload(file_path, data)
+            response = jsonify({
+                'success': False,
+                'error': 'Server is busy. Please try again shortly.'
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued'
+        }), 202
+        
+    except AdmissionError as e:
+        return _admission_error_response(e)
     except Exception as e:
-        current_app.logger.error(f"Upload processing error: {str(e)}")
+        current_app.logger.error(f"Job submission error: {str(e)}")
         return jsonify({
             'success': False,
             'error': 'An unexpected error occurred during processing'
         }), 500
 
+@main.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Get the status and progress of a background OCR job."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'pages_done': job['pages_done'],
+        'pages_total': job['pages_total'],
+        'error': job['error']
+    })
+
+@main.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running background OCR job."""
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    if job['status'] in ('finished', 'failed'):
+        return jsonify({
+            'success': False,
+            'error': f"Job is already {job['status']}",
+            'status': job['status']
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status']
+    })
+
+@main.route('/jobs/<job_id>/result')
+def get_job_result(job_id):
+    """Get the result of a finished job, in the same shape as /upload."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    if job['status'] == 'failed':
+        return jsonify({
+            'success': False,
+            'error': job['error']
+        }), 500
+    
+    if job['status'] != 'finished':
+        return jsonify({
+            'success': False,
+            'error': f"Job is {job['status']}",
+            'status': job['status']
+        }), 409
+    
+    payload = job['result'] or {'text': ''}
+    return jsonify({
+        'success': True,
+        **payload,
+        **_export_payload(payload, job['filename'], job['format']),
+        'filename': job['filename']
+    })
+
 @main.route('/download_text', methods=['POST'])
 def download_text():
-    """Download extracted text as a .txt file."""
+    """Download extracted text as a .txt file, or structured data as JSON, TSV, hOCR or ALTO."""
     try:
         data = request.get_json()
         text = data.get('text', '')
         filename = data.get('filename', 'extracted_text.txt')
         
+        output_format = (data.get('format') or 'text').lower()
+        if output_format == 'pdf':
+            return _send_searchable_pdf(data.get('pdf_id', ''), filename)
+        if output_format != 'text':
+            return _download_structured(data.get('data'), output_format, filename)
+        
         if not text:
             return jsonify({
                 'success': False,
@@ -133,15 +834,95 @@ def download_text():
             'error': 'Failed to generate download'
         }), 500
 
+def _download_structured(document, output_format, filename):
+    """Send a structured OCR document from /upload as a file in the given format."""
+    if output_format not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f'format must be one of: text, {", ".join(EXPORT_FORMATS)}'
+        }), 400
+    
+    if not document:
+        return jsonify({
+            'success': False,
+            'error': 'No structured data to download'
+        }), 400
+    
+    _, mimetype, extension = EXPORT_FORMATS[output_format]
+    try:
+        content = export_document(document, output_format, filename or '')
+    except (KeyError, TypeError, ValueError, IndexError):
+        return jsonify({
+            'success': False,
+            'error': 'Invalid structured data'
+        }), 400
+    
+    base_name = os.path.splitext(filename)[0] if filename else 'extracted_text'
+    return send_file(
+        io.BytesIO(content.encode('utf-8')),
+        as_attachment=True,
+        download_name=f"{base_name}_extracted.{extension}",
+        mimetype=mimetype
+    )
+
+@main.route('/download_pdf/<pdf_id>')
+def download_pdf(pdf_id):
+    """Download a searchable PDF produced by /upload with format=pdf."""
+    try:
+        return _send_searchable_pdf(pdf_id, request.args.get('filename', ''))
+    except Exception as e:
+        current_app.logger.error(f"Download error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to generate download'
+        }), 500
+
+def _send_searchable_pdf(pdf_id, filename):
+    """Stream a searchable PDF from the upload folder as an attachment."""
+    pdf_path = _searchable_pdf_path(pdf_id) if re.fullmatch(r'[0-9a-f]{32}', pdf_id or '') else None
+    if pdf_path is None or not os.path.exists(pdf_path):
+        return jsonify({
+            'success': False,
+            'error': 'Searchable PDF not found or expired'
+        }), 404
+    
+    base_name = os.path.splitext(filename)[0] if filename else 'extracted_text'
+    return send_file(
+        pdf_path,
+        as_attachment=True,
+        download_name=f"{base_name}_searchable.pdf",
+        mimetype='application/pdf'
+    )
+
+@main.route('/templates')
+def list_templates():
+    """List the configured zone templates and their fields."""
+    return jsonify({
+        'success': True,
+        'templates': {
+            name: {
+                field: {'box': list(zone['box']), 'page': zone['page']}
+                for field, zone in template['zones'].items()
+            }
+            for name, template in get_templates().items()
+        }
+    })
+
 @main.route('/languages')
 def get_languages():
     """Get available OCR languages."""
     try:
-        languages = ocr_processor.get_available_languages()
-        return jsonify({
+        capabilities = get_capabilities()
+        response = jsonify({
             'success': True,
-            'languages': languages
+            'languages': capabilities['languages']
         })
+        
+        # Languages only change when Tesseract is reconfigured; let browsers revalidate cheaply
+        response.set_etag(capabilities['languages_etag'])
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config.get('LANGUAGES_MAX_AGE', 300)
+        return response.make_conditional(request)
     except Exception as e:
         current_app.logger.error(f"Language retrieval error: {str(e)}")
         return jsonify({
@@ -152,11 +933,49 @@ def get_languages():
 @main.route('/health')
 def health_check():
     """Health check endpoint."""
+    capabilities = get_capabilities()
     return jsonify({
         'status': 'healthy',
-        'service': 'OCR Web Application'
+        'service': 'OCR Web Application',
+        'engine': capabilities['engine'],
+        'tesseract': capabilities['tesseract'],
+        'poppler': capabilities['poppler'],
+        'languages': len(capabilities['languages'])
     })
 
+@main.route('/metrics')
+def get_metrics():
+    """Expose pipeline metrics in the Prometheus text format."""
+    capabilities = get_capabilities()
+    metrics.ENGINE_INFO.set(
+        1,
+        capabilities['engine'],
+        capabilities['tesseract']['version'] or '',
+        capabilities['poppler']['version'] or ''
+    )
+    
+    admission = get_admission().stats()
+    metrics.ADMISSION_PAGES.set(admission['pages_in_flight'])
+    metrics.ADMISSION_WAITING.set(admission['waiting'])
+    metrics.JANITOR_TRACKED.set(get_janitor().stats()['tracked_files'])
+    
+    cache = get_cache()
+    if cache is not None:
+        stats = cache.stats()
+        metrics.CACHE_LOOKUPS.set(stats['hits'], 'hit')
+        metrics.CACHE_LOOKUPS.set(stats['misses'], 'miss')
+        metrics.CACHE_BYTES.set(stats['bytes'])
+    
+    page_cache = get_page_cache()
+    if page_cache is not None:
+        stats = page_cache.stats()
+        metrics.PAGE_CACHE_LOOKUPS.set(stats['hits'], 'hit')
+        metrics.PAGE_CACHE_LOOKUPS.set(stats['near_hits'], 'near_hit')
+        metrics.PAGE_CACHE_LOOKUPS.set(stats['misses'], 'miss')
+        metrics.PAGE_CACHE_ENTRIES.set(stats['entries'])
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Error handlers
 @main.errorhandler(413)
 def too_large(e):
@@ -0,0 +1,206 @@
+"""
+Structured OCR results: words with boxes, layout numbering and confidences.
+
+A document is stored column-wise, one list per field with one entry per
+word, as Tesseract's image_to_data reports it:
+
+    {
+        'pages': [{'page_num': 1, 'width': 2480, 'height': 3508}],
+        'words': {'page_num': [...], 'block_num': [...], ..., 'text': [...]}
+    }
+
+Lines, paragraphs and blocks are implied by the numbering columns. The
+document can be exported as JSON, Tesseract TSV, hOCR or ALTO.
+"""
+
+import json
+from itertools import groupby
+from xml.sax.saxutils import escape, quoteattr
+
+WORD_COLUMNS = (
+    'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+    'left', 'top', 'width', 'height', 'conf', 'text'
+)
+
+# Tesseract's image_to_data level for word rows
+WORD_LEVEL = 5
+
+def empty_document():
+    """A document with no pages."""
+    return {'pages': [], 'words': {column: [] for column in WORD_COLUMNS}}
+
+def words_from_tesseract(data):
+    """Keep the non-empty word rows of an image_to_data dict, as columns without page_num."""
+    words = {column: [] for column in WORD_COLUMNS if column != 'page_num'}
+    for i, text in enumerate(data['text']):
+        if int(data['level'][i]) != WORD_LEVEL or not str(text).strip():
+            continue
+        for column in words:
+            value = data[column][i]
+            if column == 'text':
+                words[column].append(str(value))
+            elif column == 'conf':
+                words[column].append(round(float(value), 2))
+            else:
+                words[column].append(int(value))
+    return words
+
+def add_page(document, page_num, width, height, words):
+    """Append one page's word columns to a document."""
+    document['pages'].append({'page_num': page_num, 'width': width, 'height': height})
+    columns = document['words']
+    columns['page_num'].extend([page_num] * len(words['text']))
+    for column, values in words.items():
+        columns[column].extend(values)
+    return document
+
+def words_to_text(words):
+    """Plain text of word columns: words joined into lines, blank lines between blocks."""
+    lines = []
+    last_block = None
+    for _, indices in _group(range(len(words['text'])), words, ('block_num', 'par_num', 'line_num')):
+        indices = list(indices)
+        block = words['block_num'][indices[0]]
+        if last_block is not None and block != last_block:
+            lines.append('')
+        last_block = block
+        lines.append(' '.join(words['text'][i] for i in indices))
+    return '\n'.join(lines)
+
+def _group(indices, words, columns):
+    """groupby over word indices on one or more numbering columns."""
+    return groupby(indices, key=lambda i: tuple(words[column][i] for column in columns))
+
+def _bbox(words, indices):
+    """(left, top, right, bottom) enclosing the given words."""
+    indices = list(indices)
+    return (
+        min(words['left'][i] for i in indices),
+        min(words['top'][i] for i in indices),
+        max(words['left'][i] + words['width'][i] for i in indices),
+        max(words['top'][i] + words['height'][i] for i in indices)
+    )
+
+def _page_words(document):
+    """Yield (page info, list of word indices on that page)."""
+    words = document['words']
+    by_page = {}
+    for i, page_num in enumerate(words['page_num']):
+        by_page.setdefault(page_num, []).append(i)
+    for page in document['pages']:
+        yield page, by_page.get(page['page_num'], [])
+
+def to_json(document, filename=''):
+    """The columnar document itself."""
+    return json.dumps(document, ensure_ascii=False)
+
+def to_tsv(document, filename=''):
+    """Tesseract-style TSV with one row per word."""
+    words = document['words']
+    header = ['level'] + list(WORD_COLUMNS)
+    rows = ['\t'.join(header)]
+    for i in range(len(words['text'])):
+        values = [WORD_LEVEL] + [words[column][i] for column in WORD_COLUMNS]
+        rows.append('\t'.join(str(value).replace('\t', ' ') for value in values))
+    return '\n'.join(rows) + '\n'
+
+def to_hocr(document, filename=''):
+    """hOCR (XHTML) with pages, content areas, paragraphs, lines and words."""
+    words = document['words']
+    out = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" '
+        '"http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">',
+        '<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">',
+        '<head>',
+        f'<title>{escape(filename)}</title>',
+        '<meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>',
+        '<meta name="ocr-system" content="tesseract"/>',
+        '<meta name="ocr-capabilities" content="ocr_page ocr_carea ocr_par ocr_line ocrx_word"/>',
+        '</head>',
+        '<body>'
+    ]
+
+    for page_index, (page, indices) in enumerate(_page_words(document)):
+        p = page['page_num']
+        out.append(f"<div class='ocr_page' id='page_{p}' title='bbox 0 0 {page['width']} {page['height']}; ppageno {page_index}'>")
+        for (block,), block_words in _group(indices, words, ('block_num',)):
+            block_words = list(block_words)
+            out.append(f"<div class='ocr_carea' id='block_{p}_{block}' title='bbox {' '.join(map(str, _bbox(words, block_words)))}'>")
+            for (par,), par_words in _group(block_words, words, ('par_num',)):
+                par_words = list(par_words)
+                out.append(f"<p class='ocr_par' id='par_{p}_{block}_{par}' title='bbox {' '.join(map(str, _bbox(words, par_words)))}'>")
+                for (line,), line_words in _group(par_words, words, ('line_num',)):
+                    line_words = list(line_words)
+                    out.append(f"<span class='ocr_line' id='line_{p}_{block}_{par}_{line}' title='bbox {' '.join(map(str, _bbox(words, line_words)))}'>")
+                    for i in line_words:
+                        out.append(
+                            f"<span class='ocrx_word' id='word_{p}_{block}_{par}_{line}_{words['word_num'][i]}' "
+                            f"title='bbox {' '.join(map(str, _bbox(words, [i])))}; x_wconf {max(0, round(words['conf'][i]))}'>"
+                            f"{escape(words['text'][i])}</span>"
+                        )
+                    out.append('</span>')
+                out.append('</p>')
+            out.append('</div>')
+        out.append('</div>')
+
+    out.extend(['</body>', '</html>'])
+    return '\n'.join(out) + '\n'
+
+def _alto_box(words, indices):
+    left, top, right, bottom = _bbox(words, indices)
+    return f'HPOS="{left}" VPOS="{top}" WIDTH="{right - left}" HEIGHT="{bottom - top}"'
+
+def to_alto(document, filename=''):
+    """ALTO v4 XML with text blocks, lines and strings."""
+    words = document['words']
+    out = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<alto xmlns="http://www.loc.gov/standards/alto/ns-v4#" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        'xsi:schemaLocation="http://www.loc.gov/standards/alto/ns-v4# http://www.loc.gov/alto/v4/alto-4-2.xsd">',
+        '<Description>',
+        '<MeasurementUnit>pixel</MeasurementUnit>',
+        f'<sourceImageInformation><fileName>{escape(filename)}</fileName></sourceImageInformation>',
+        '</Description>',
+        '<Layout>'
+    ]
+
+    for page_index, (page, indices) in enumerate(_page_words(document), 1):
+        p = page['page_num']
+        size = f'WIDTH="{page["width"]}" HEIGHT="{page["height"]}"'
+        out.append(f'<Page ID="page_{p}" PHYSICAL_IMG_NR="{page_index}" {size}>')
+        out.append(f'<PrintSpace HPOS="0" VPOS="0" {size}>')
+        for (block,), block_words in _group(indices, words, ('block_num',)):
+            block_words = list(block_words)
+            out.append(f'<TextBlock ID="block_{p}_{block}" {_alto_box(words, block_words)}>')
+            for (par, line), line_words in _group(block_words, words, ('par_num', 'line_num')):
+                line_words = list(line_words)
+                out.append(f'<TextLine ID="line_{p}_{block}_{par}_{line}" {_alto_box(words, line_words)}>')
+                for n, i in enumerate(line_words):
+                    if n:
+                        out.append('<SP/>')
+                    confidence = max(0.0, min(1.0, words['conf'][i] / 100))
+                    out.append(
+                        f'<String ID="string_{p}_{block}_{par}_{line}_{words["word_num"][i]}" {_alto_box(words, [i])} '
+                        f'WC="{confidence:.2f}" CONTENT={quoteattr(words["text"][i])}/>'
+                    )
+                out.append('</TextLine>')
+            out.append('</TextBlock>')
+        out.append('</PrintSpace>')
+        out.append('</Page>')
+
+    out.extend(['</Layout>', '</alto>'])
+    return '\n'.join(out) + '\n'
+
+# Export format -> (renderer, mimetype, file extension)
+EXPORT_FORMATS = {
+    'json': (to_json, 'application/json', 'json'),
+    'tsv': (to_tsv, 'text/tab-separated-values', 'tsv'),
+    'hocr': (to_hocr, 'text/html', 'hocr'),
+    'alto': (to_alto, 'application/xml', 'xml')
+}
+
+def export_document(document, output_format, filename=''):
+    """Render a document in one of EXPORT_FORMATS."""
+    return EXPORT_FORMATS[output_format][0](document, filename)
@@ -1,7 +1,7 @@
-import os
 import magic
 import hashlib
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 from werkzeug.utils import secure_filename
 from flask import current_app
 
@@ -10,19 +10,49 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
-def validate_file_type(file_path):
-    """Validate file type using magic numbers (MIME type detection)."""
+# MIME types accepted by magic number validation, with their file extensions
+ALLOWED_MIMES = {
+    'image/jpeg': ['jpg', 'jpeg'],
+    'image/png': ['png'],
+    'image/tiff': ['tif', 'tiff'],
+    'image/webp': ['webp'],
+    'image/bmp': ['bmp'],
+    'image/x-ms-bmp': ['bmp'],  # Older libmagic
+    'image/gif': ['gif'],
+    'application/pdf': ['pdf']
+}
+
+# Bytes of file header needed for MIME detection
+MIME_HEADER_SIZE = 8192
+
+# libmagic handles are not thread-safe, so each thread loads the database once
+_magic_local = threading.local()
+
+def _get_magic():
+    """Get this thread's MIME detector."""
+    detector = getattr(_magic_local, 'detector', None)
+    if detector is None:
+        detector = _magic_local.detector = magic.Magic(mime=True)
+    return detector
+
+def _mime_matches_extension(file_mime, filename):
+    """Check a detected MIME type is allowed and agrees with the file extension."""
+    extensions = ALLOWED_MIMES.get(file_mime)
+    if extensions is None:
+        return False
+    if filename is None:
+        return True
+    ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    return ext in extensions
+
+def validate_file_buffer(data, filename=None):
+    """Validate file contents using magic numbers from the file header.
+
+    When filename is given, the detected type must also match its extension.
+    """
     try:
-        mime = magic.Magic(mime=True)
-        file_mime = mime.from_file(file_path)
-        
-        allowed_mimes = {
-            'image/jpeg': ['jpg', 'jpeg'],
-            'image/png': ['png'],
-            'application/pdf': ['pdf']
-        }
-        
-        return file_mime in allowed_mimes
+        file_mime = _get_magic().from_buffer(bytes(data[:MIME_HEADER_SIZE]))
+        return _mime_matches_extension(file_mime, filename)
     except Exception as e:
         current_app.logger.error(f"File type validation error: {str(e)}")
         return False
@@ -42,24 +72,6 @@ def generate_unique_filename(filename):
     
     return f"{base_name}_{file_hash}.{ext}" if ext else f"{base_name}_{file_hash}"
 
-def cleanup_old_files():
-    """Remove old uploaded files based on retention policy."""
-    try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        retention_hours = current_app.config['FILE_RETENTION_HOURS']
-        cutoff_time = datetime.now() - timedelta(hours=retention_hours)
-        
-        for filename in os.listdir(upload_folder):
-            file_path = os.path.join(upload_folder, filename)
-            if os.path.isfile(file_path):
-                file_time = datetime.fromtimestamp(os.path.getctime(file_path))
-                if file_time < cutoff_time:
-                    os.remove(file_path)
-                    current_app.logger.info(f"Cleaned up old file: {filename}")
-                    
-    except Exception as e:
-        current_app.logger.error(f"File cleanup error: {str(e)}")
-
 def format_file_size(size_bytes):
     """Convert bytes to human readable format."""
     if size_bytes == 0:
@@ -85,3 +97,17 @@ def sanitize_text(text):
     text = text.replace('\r\n', '\n').replace('\r', '\n')
     
     return text.strip()
+
+def build_result_payload(result):
+    """Extract the client-facing fields of a successful OCR result.
+
+    The same payload is stored in the result cache, so cached responses
+    match fresh ones.
+    """
+    payload = {'text': sanitize_text(result['text'])}
+    for field in ('pages_processed', 'total_pages', 'data', 'detected', 'partial', 'failed_pages'):
+        if result.get(field) is not None:
+            payload[field] = result[field]
+    if result.get('fields') is not None:
+        payload['fields'] = {name: sanitize_text(value) for name, value in result['fields'].items()}
+    return payload
@@ -0,0 +1,114 @@
+"""
+Zone templates for forms.
+
+A template names the fields of a fixed layout and the box each one occupies,
+in page-relative coordinates (0-1) so it applies at any scan resolution:
+
+    {
+        "invoice": {
+            "zones": {
+                "invoice_number": {"box": [0.70, 0.05, 0.95, 0.09], "psm": 7, "whitelist": "0123456789-"},
+                "total": {"box": [0.70, 0.85, 0.95, 0.90], "psm": 7, "page": 2}
+            }
+        }
+    }
+
+Each zone may set its own page segmentation mode (default 7, a single text
+line), character whitelist, language and PDF page (default 1). Only the
+zones are OCR'd, instead of the whole page.
+"""
+
+import json
+import logging
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Tesseract page segmentation mode for zones that do not set one: a single text line
+DEFAULT_ZONE_PSM = 7
+
+def parse_template(name, definition):
+    """Validate a template definition and fill in zone defaults.
+
+    Raises:
+        ValueError: If the template or one of its zones is malformed
+    """
+    if not isinstance(definition, dict) or not isinstance(definition.get('zones'), dict) or not definition['zones']:
+        raise ValueError(f"Template {name!r} needs a non-empty 'zones' mapping")
+
+    zones = {}
+    for field, zone in definition['zones'].items():
+        where = f"Template {name!r} zone {field!r}"
+        if not isinstance(zone, dict):
+            raise ValueError(f'{where} must be a mapping')
+
+        box = zone.get('box')
+        if not isinstance(box, (list, tuple)) or len(box) != 4:
+            raise ValueError(f'{where} needs a box of [left, top, right, bottom]')
+        left, top, right, bottom = (float(value) for value in box)
+        if not (0 <= left < right <= 1 and 0 <= top < bottom <= 1):
+            raise ValueError(f'{where} box must be page-relative, between 0 and 1')
+
+        psm = int(zone.get('psm', DEFAULT_ZONE_PSM))
+        if not 0 <= psm <= 13:
+            raise ValueError(f'{where} psm must be between 0 and 13')
+
+        whitelist = zone.get('whitelist') or None
+        if whitelist is not None and (not isinstance(whitelist, str) or any(c.isspace() for c in whitelist)):
+            raise ValueError(f'{where} whitelist must be a string without whitespace')
+
+        page = int(zone.get('page', 1))
+        if page < 1:
+            raise ValueError(f'{where} page must be a positive integer')
+
+        zones[field] = {
+            'box': (left, top, right, bottom),
+            'psm': psm,
+            'whitelist': whitelist,
+            'language': zone.get('language') or None,
+            'page': page
+        }
+    return {'name': name, 'zones': zones}
+
+def zone_config(zone):
+    """Tesseract config string for one zone."""
+    config = f"--oem 3 --psm {zone['psm']}"
+    if zone['whitelist']:
+        config += f" -c tessedit_char_whitelist={zone['whitelist']}"
+    return config
+
+def zone_box(zone, width, height):
+    """Pixel (left, upper, right, lower) crop box of a zone on a page image."""
+    left, top, right, bottom = zone['box']
+    return (
+        int(left * width),
+        int(top * height),
+        max(int(left * width) + 1, round(right * width)),
+        max(int(top * height) + 1, round(bottom * height))
+    )
+
+def fields_to_text(fields):
+    """Plain text rendering of a field map, one 'field: value' line each."""
+    return '\n'.join(f'{field}: {value}' for field, value in fields.items())
+
+def init_templates(app):
+    """Load zone templates from OCR_TEMPLATES and OCR_TEMPLATES_FILE."""
+    definitions = dict(app.config.get('OCR_TEMPLATES') or {})
+    templates_file = app.config.get('OCR_TEMPLATES_FILE')
+    if templates_file:
+        with open(templates_file, encoding='utf-8') as f:
+            definitions.update(json.load(f))
+
+    templates = {name: parse_template(name, definition) for name, definition in definitions.items()}
+    app.extensions['ocr_templates'] = templates
+    if templates:
+        logger.info(f"Loaded {len(templates)} OCR template(s): {', '.join(templates)}")
+    return templates
+
+def get_template(name):
+    """Get a template by name for the current app, or None."""
+    return current_app.extensions['ocr_templates'].get(name)
+
+def get_templates():
+    """Get all templates for the current app, keyed by name."""
+    return current_app.extensions['ocr_templates']
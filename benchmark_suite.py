@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for OCR Web Application.
+Generates a deterministic corpus and measures latency, throughput, memory
+and per-stage time through OCRProcessor.process_file and the /upload route.
+"""
+
+import os
+
+# Every iteration must do the full work; never serve results from the cache
+os.environ['OCR_CACHE_BACKEND'] = 'none'
+
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import contextlib
+import platform
+import tempfile
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not available on Windows
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# stdout carries only the JSON report; the app prints its dependency check on import
+with contextlib.redirect_stdout(sys.stderr):
+    from app import create_app
+    from app.ocr_processor import OCRProcessor
+    from app.capabilities import get_capabilities
+
+WORDS = (
+    'optical character recognition extracts printed text from scanned pages and '
+    'photographs the quick brown fox jumps over the lazy dog invoice total amount '
+    'date reference customer address quantity price tax subtotal page document'
+).split()
+
+# (name, width, height, font size): A4 at 72, 150 and 300 DPI plus a short label
+IMAGE_SIZES = [
+    ('label', 600, 200, 24),
+    ('a4_72dpi', 595, 842, 12),
+    ('a4_150dpi', 1240, 1754, 24),
+    ('a4_300dpi', 2480, 3508, 48)
+]
+
+# (name, page count, scanned): scanned pages are images, the rest have a text layer
+PDF_DOCUMENTS = [
+    ('pdf_text_3p', 3, False),
+    ('pdf_scan_3p', 3, True),
+    ('pdf_scan_10p', 10, True)
+]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil without floats
+    return ordered[int(rank) - 1]
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far in MB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class OCRBenchmark:
+    def __init__(self, iterations=5, warmup=1, seed=1234, workdir=None, modes=('processor', 'http')):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.seed = seed
+        self.owns_workdir = workdir is None  # A generated temporary corpus is removed by cleanup()
+        self.workdir = workdir or tempfile.mkdtemp(prefix='ocr-benchmark-')
+        os.makedirs(self.workdir, exist_ok=True)
+        self.modes = modes
+        self.app = create_app('testing')
+        self.processor = OCRProcessor()
+        self.font_name, self.fonts = None, {}
+
+    def get_font(self, size):
+        """Get a TrueType font if one is installed, for realistic glyph sizes."""
+        if size not in self.fonts:
+            for name in ('DejaVuSans.ttf', 'arial.ttf', 'Arial.ttf'):
+                try:
+                    self.fonts[size] = ImageFont.truetype(name, size)
+                    self.font_name = name
+                    break
+                except OSError:
+                    continue
+            else:
+                self.fonts[size] = ImageFont.load_default()
+                self.font_name = 'default'
+        return self.fonts[size]
+
+    def make_lines(self, rng, count, words_per_line=8):
+        """Deterministic pseudo-random lines of text."""
+        return [' '.join(rng.choice(WORDS) for _ in range(words_per_line)) for _ in range(count)]
+
+    def render_page(self, rng, width, height, font_size):
+        """Render a page of black text on white."""
+        image = Image.new('RGB', (width, height), 'white')
+        draw = ImageDraw.Draw(image)
+        font = self.get_font(font_size)
+        margin = font_size * 2
+        line_height = int(font_size * 1.6)
+        lines = self.make_lines(rng, max(1, (height - 2 * margin) // line_height))
+        for i, line in enumerate(lines):
+            draw.text((margin, margin + i * line_height), line, fill='black', font=font)
+        return image
+
+    def build_corpus(self):
+        """Write the benchmark corpus to the work directory.
+
+        Returns:
+            list: Cases with name, path and page count
+        """
+        rng = random.Random(self.seed)
+        cases = []
+
+        for name, width, height, font_size in IMAGE_SIZES:
+            path = os.path.join(self.workdir, f'{name}.png')
+            self.render_page(rng, width, height, font_size).save(path, 'PNG')
+            cases.append({'name': name, 'path': path, 'pages': 1})
+
+        jpeg_path = os.path.join(self.workdir, 'a4_150dpi_photo.jpg')
+        self.render_page(rng, 1240, 1754, 24).save(jpeg_path, 'JPEG', quality=85)
+        cases.append({'name': 'a4_150dpi_photo', 'path': jpeg_path, 'pages': 1})
+
+        for name, page_count, scanned in PDF_DOCUMENTS:
+            path = os.path.join(self.workdir, f'{name}.pdf')
+            pdf = canvas.Canvas(path, pagesize=A4, invariant=1)  # invariant: no timestamps, same bytes every run
+            width, height = A4
+            for _ in range(page_count):
+                if scanned:
+                    page = self.render_page(rng, 1240, 1754, 24)
+                    pdf.drawImage(ImageReader(page), 0, 0, width=width, height=height)
+                else:
+                    text = pdf.beginText(72, height - 72)
+                    text.setFont('Helvetica', 11)
+                    for line in self.make_lines(rng, 45, 10):
+                        text.textLine(line)
+                    pdf.drawText(text)
+                pdf.showPage()
+            pdf.save()
+            cases.append({'name': name, 'path': path, 'pages': page_count})
+
+        return cases
+
+    def time_processor(self, case, language):
+        """OCR a case once through OCRProcessor.process_file."""
+        started = time.perf_counter()
+        result = self.processor.process_file(case['path'], language)
+        elapsed = time.perf_counter() - started
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        return elapsed, result.get('pages_processed') or 1, result.get('timings') or {}
+
+    def time_http(self, client, case, language):
+        """OCR a case once through POST /upload on the test client."""
+        with open(case['path'], 'rb') as f:
+            data = f.read()
+
+        started = time.perf_counter()
+        response = client.post('/upload', data={
+            'file': (io.BytesIO(data), os.path.basename(case['path'])),
+            'language': language,
+            'timings': '1'
+        })
+        elapsed = time.perf_counter() - started
+
+        body = response.get_json()
+        if response.status_code != 200 or not body.get('success'):
+            raise RuntimeError(body.get('error', f'HTTP {response.status_code}'))
+        timings = {stage: ms / 1000 for stage, ms in body.get('timings', {}).items()}
+        return elapsed, body.get('pages_processed') or 1, timings
+
+    def run_case(self, case, mode, language, client=None):
+        """Run warmup and measured iterations of one case in one mode."""
+        def run_once():
+            if mode == 'http':
+                return self.time_http(client, case, language)
+            return self.time_processor(case, language)
+
+        for _ in range(self.warmup):
+            run_once()
+
+        latencies = []
+        pages = 0
+        stages = {}
+        for _ in range(self.iterations):
+            elapsed, page_count, timings = run_once()
+            latencies.append(elapsed)
+            pages += page_count
+            for stage, seconds in timings.items():
+                stages[stage] = stages.get(stage, 0.0) + seconds
+
+        total = sum(latencies)
+        return {
+            'case': case['name'],
+            'mode': mode,
+            'iterations': self.iterations,
+            'pages_per_iteration': pages // self.iterations,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'mean_ms': round(total / len(latencies) * 1000, 2),
+            'pages_per_sec': round(pages / total, 2) if total else None,
+            'stages_ms': {stage: round(seconds / self.iterations * 1000, 2) for stage, seconds in sorted(stages.items())},
+            # ru_maxrss only grows, so this is the process peak so far, not this case's own
+            'process_peak_rss_mb': peak_rss_mb()
+        }
+
+    def cleanup(self):
+        """Remove the generated corpus unless it lives in a caller-supplied work directory."""
+        if self.owns_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def run(self, language='eng', case_filter=None):
+        """Run the benchmark and return the JSON report."""
+        print(f"🏁 OCR benchmark: {self.iterations} iteration(s), {self.warmup} warmup, corpus in {self.workdir}", file=sys.stderr)
+
+        cases = self.build_corpus()
+        if case_filter:
+            cases = [case for case in cases if case_filter in case['name']]
+
+        results = []
+        with self.app.app_context():
+            capabilities = get_capabilities()
+            client = self.app.test_client()
+            if not capabilities['tesseract']['available']:
+                print("⚠️  Tesseract not available: timing demonstration mode, not real OCR", file=sys.stderr)
+
+            for case in cases:
+                for mode in self.modes:
+                    try:
+                        result = self.run_case(case, mode, language, client)
+                        print(f"  {case['name']:<18} {mode:<9} p50 {result['p50_ms']:>9.1f} ms  "
+                              f"p95 {result['p95_ms']:>9.1f} ms  {result['pages_per_sec']} pages/s", file=sys.stderr)
+                    except Exception as e:
+                        result = {'case': case['name'], 'mode': mode, 'error': str(e)}
+                        print(f"  {case['name']:<18} {mode:<9} ❌ {e}", file=sys.stderr)
+                    results.append(result)
+
+        return {
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'engine': capabilities['engine'],
+                'tesseract': capabilities['tesseract']['version'],
+                'poppler': capabilities['poppler']['version'],
+                'font': self.font_name,
+                'language': language,
+                'seed': self.seed,
+                'page_workers': self.app.config.get('OCR_PAGE_WORKERS'),
+                'worker_type': self.app.config.get('OCR_WORKER_TYPE')
+            },
+            'results': results,
+            'peak_rss_mb': peak_rss_mb()
+        }
+
+def compare_reports(report, baseline, threshold):
+    """Find results that got slower than the baseline by more than threshold.
+
+    Returns:
+        list: Human readable regression descriptions
+    """
+    previous = {(r['case'], r['mode']): r for r in baseline.get('results', []) if 'error' not in r}
+    regressions = []
+
+    for result in report['results']:
+        before = previous.get((result['case'], result['mode']))
+        if before is None:
+            continue
+        label = f"{result['case']} [{result['mode']}]"
+        if 'error' in result:
+            regressions.append(f"{label}: failed ({result['error']})")
+            continue
+
+        for metric in ('p50_ms', 'p95_ms'):
+            if before[metric] and result[metric] > before[metric] * (1 + threshold):
+                regressions.append(f"{label}: {metric} {before[metric]} -> {result[metric]}")
+        if before.get('pages_per_sec') and result['pages_per_sec'] < before['pages_per_sec'] * (1 - threshold):
+            regressions.append(f"{label}: pages_per_sec {before['pages_per_sec']} -> {result['pages_per_sec']}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OCR throughput and latency without a server.')
+    parser.add_argument('--iterations', type=int, default=5, help='Measured runs per case (default: 5)')
+    parser.add_argument('--warmup', type=int, default=1, help='Unmeasured runs per case (default: 1)')
+    parser.add_argument('--seed', type=int, default=1234, help='Corpus random seed (default: 1234)')
+    parser.add_argument('--language', default='eng', help="OCR language (default: 'eng')")
+    parser.add_argument('--cases', help='Only run cases whose name contains this string')
+    parser.add_argument('--mode', choices=['processor', 'http', 'both'], default='both',
+                        help='Call process_file directly, go through /upload, or both (default: both)')
+    parser.add_argument('--workdir', help='Keep the generated corpus in this directory (default: a temporary one, removed afterwards)')
+    parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+    parser.add_argument('--baseline', help='Compare against a previous JSON report')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown flagged as a regression (default: 0.10)')
+    args = parser.parse_args()
+
+    modes = ('processor', 'http') if args.mode == 'both' else (args.mode,)
+    benchmark = OCRBenchmark(args.iterations, args.warmup, args.seed, args.workdir, modes)
+    try:
+        report = benchmark.run(args.language, args.cases)
+    finally:
+        benchmark.cleanup()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f"📄 Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%} against {args.baseline}:", file=sys.stderr)
+            for regression in regressions:
+                print(f"   {regression}", file=sys.stderr)
+            return 1
+        print(f"✅ No regressions over {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,22 +17,98 @@ class Config:
     # File upload settings
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'tif', 'tiff', 'webp', 'bmp', 'gif', 'pdf'}
+    IN_MEMORY_UPLOAD_MAX_BYTES = 4 * 1024 * 1024  # Uploads up to this size are OCR'd without touching UPLOAD_FOLDER (0 disables)
     
     # OCR settings
     TESSERACT_CMD = os.environ.get('TESSERACT_CMD') or r'C:\Program Files\Tesseract-OCR\tesseract.exe'
     POPPLER_PATH = os.environ.get('POPPLER_PATH') or r'C:\poppler\poppler-24.08.0\Library\bin'
     OCR_LANGUAGES = ['eng']  # Default language
+    OCR_ENGINE = os.environ.get('OCR_ENGINE') or 'pytesseract'  # 'pytesseract' or 'tesserocr' (in-process, needs tesserocr)
+    TESSDATA_PATH = os.environ.get('TESSDATA_PREFIX')  # traineddata directory for the tesserocr engine
+    CAPABILITY_PROBE_AT_STARTUP = True  # Probe Tesseract, languages and Poppler when the app starts
+    CAPABILITY_TTL = 3600  # Seconds before capabilities are re-probed (0 = never)
+    LANGUAGES_MAX_AGE = 300  # Cache-Control max-age for /languages
+    OCR_AUTO_FALLBACK_LANGUAGE = 'eng'  # Used with language=auto when a page's script cannot be detected
+    OCR_OSD_MAX_SIDE = 1600  # Pages are downscaled to this many pixels per side for script detection
+    OCR_SCRIPT_LANGUAGES = {  # Detected script -> languages OCR'd with language=auto (uninstalled ones are skipped)
+        'Latin': 'eng',
+        'Cyrillic': 'rus',
+        'Arabic': 'ara',
+        'Greek': 'ell',
+        'Hebrew': 'heb',
+        'Han': 'chi_sim',
+        'Hangul': 'kor',
+        'Japanese': 'jpn',
+        'Katakana': 'jpn',
+        'Hiragana': 'jpn',
+        'Devanagari': 'hin',
+        'Thai': 'tha'
+    }
+    OCR_TEMPLATES = {}  # Named zone templates for fixed-layout forms (see README)
+    OCR_TEMPLATES_FILE = os.environ.get('OCR_TEMPLATES_FILE')  # JSON file with more zone templates
     
     # Security settings
-    UPLOAD_RATE_LIMIT = "10 per minute"  # Rate limiting for uploads
+    UPLOAD_RATE_LIMIT = "10 per minute"  # Per-client limit on upload requests (None disables)
     
     # File retention settings
     FILE_RETENTION_HOURS = 1  # Auto-delete uploaded files after 1 hour
+    CLEANUP_INTERVAL = 300  # Seconds between background cleanup passes (0 disables the janitor)
     
     # Performance settings
-    MAX_CONCURRENT_UPLOADS = 5
-    OCR_TIMEOUT = 30  # seconds
+    MAX_CONCURRENT_UPLOADS = 5  # OCR requests running at once per worker process
+    MAX_CONCURRENT_PAGES = 40  # Estimated pages being OCR'd at once per worker process
+    ADMISSION_QUEUE_DEPTH = 10  # Requests waiting for capacity before new ones get 503
+    ADMISSION_WAIT_TIMEOUT = 10  # Seconds a request waits for capacity before 503
+    ADMISSION_RETRY_AFTER = 5  # Retry-After seconds sent with 503 responses
+    OCR_TIMEOUT = 30  # Seconds Tesseract may spend on one page before it is killed
+    OCR_DOCUMENT_TIMEOUT = 300  # Seconds for a whole document; pages left over are skipped
+    OCR_PAGE_WORKERS = int(os.environ.get('OCR_PAGE_WORKERS') or os.cpu_count() or 1)  # Pages OCR'd concurrently
+    OCR_WORKER_TYPE = os.environ.get('OCR_WORKER_TYPE') or 'thread'  # 'thread' or 'process'
+    PDF_DPI = 300  # Rasterization DPI for PDF pages of unknown size
+    PDF_TARGET_PIXELS = 8_400_000  # Pixel budget per rasterized page (letter at 300 DPI)
+    PDF_MIN_DPI = 150  # DPI bounds applied to the pixel-budget choice
+    PDF_MAX_DPI = 400
+    PDF_USE_TEXT_LAYER = True  # Use embedded text of born-digital pages instead of OCR
+    PDF_TEXT_LAYER_MIN_CHARS = 50  # Embedded characters needed to skip OCR for a page
+    PDF_MAX_PAGES = 200  # Most pages processed per PDF request
+    PDF_CHUNK_PAGES = 20  # Pages probed and processed together
+    PDF_RENDER_MEMORY_MB = 128  # Upper bound on rasterized page memory per PDF request
+    IMAGE_MAX_PIXELS = 8_400_000  # Larger images are decoded or reduced to about this size (letter at 300 DPI); 0 keeps full size
+    IMAGE_MAX_DECODE_PIXELS = 50_000_000  # Images needing more pixels decoded than this are refused
+    
+    # Image preprocessing settings (requires NumPy)
+    OCR_PREPROCESS = False  # Clean up images before OCR
+    PREPROCESS_STAGES = ['grayscale', 'downscale', 'deskew', 'binarize', 'crop']  # Run in this order
+    PREPROCESS_TARGET_TEXT_HEIGHT = 32  # Downscale until text lines are about this many pixels tall
+    PREPROCESS_MAX_SKEW = 10.0  # Largest rotation (degrees) searched when deskewing
+    PREPROCESS_BINARIZE_WINDOW = 31  # Sauvola window size in pixels
+    PREPROCESS_BINARIZE_K = 0.2  # Sauvola sensitivity
+    PREPROCESS_CROP_MARGIN = 10  # Pixels kept around the inked area
+    
+    # Background job settings
+    JOB_BACKEND = os.environ.get('JOB_BACKEND') or 'memory'  # 'memory' or 'sqlite' (shared between workers)
+    JOB_DB_PATH = os.environ.get('JOB_DB_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'jobs.sqlite3')
+    JOB_WORKERS = MAX_CONCURRENT_UPLOADS  # OCR jobs running at once per worker process
+    JOB_QUEUE_DEPTH = 20  # Jobs queued or running before new submissions get 503
+    BATCH_MAX_FILES = 500  # Files (including zip members) accepted per /upload/batch request
+    BATCH_WORKERS = MAX_CONCURRENT_UPLOADS  # Batch files OCR'd at once per worker process, on a pool separate from jobs
+    BATCH_MAX_STAGED = 10  # Batch files staged and waiting for OCR at once per request
+    BATCH_MAX_ZIP_BYTES = 100 * 1024 * 1024  # Most a zip archive in a batch may expand to (100MB)
+    STREAM_KEEPALIVE_SECONDS = 15  # Idle seconds between keepalive comments on /upload/stream
+    
+    # Result cache settings
+    OCR_CACHE_BACKEND = os.environ.get('OCR_CACHE_BACKEND') or 'memory'  # 'memory', 'disk' or 'none'
+    OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+    OCR_CACHE_TTL = 24 * 60 * 60  # seconds
+    OCR_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64MB of cached results
+    OCR_PAGE_DEDUP = False  # Reuse the text of PDF pages that look like an earlier page
+    OCR_PAGE_DEDUP_DISTANCE = 4  # Differing hash bits still treated as the same page (0 = identical hashes only)
+    OCR_PAGE_DEDUP_HASH_SIZE = 16  # dHash grid side; 16 gives 256-bit hashes
+    OCR_PAGE_DEDUP_MAX_ENTRIES = 1000  # Page hashes remembered per process
+    
+    # Monitoring settings
+    EXPOSE_TIMINGS = False  # Always return per-request stage timings (otherwise only when timings=1 is sent)
     
     @staticmethod
     def init_app(app):
@@ -52,6 +128,7 @@ class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     WTF_CSRF_ENABLED = False
+    UPLOAD_RATE_LIMIT = None  # Test clients share one address
 
 # Configuration dictionary
 config = {
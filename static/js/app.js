@@ -16,6 +16,9 @@ class OCRApp {
 
         // UI elements
         this.progressContainer = document.getElementById('progressContainer');
+        this.progressBar = this.progressContainer.querySelector('.progress-bar');
+        this.progressStatus = this.progressContainer.querySelector('small');
+        this.progressStatusHTML = this.progressStatus.innerHTML;
         this.resultsContainer = document.getElementById('resultsContainer');
         this.errorAlert = document.getElementById('errorAlert');
         this.errorMessage = document.getElementById('errorMessage');
@@ -29,6 +32,7 @@ class OCRApp {
         // State
         this.currentFileName = '';
         this.currentText = '';
+        this.streamController = null;
     }
 
     bindEvents() {
@@ -102,9 +106,9 @@ class OCRApp {
             }
 
             // Validate file type
-            const allowedTypes = ['image/jpeg', 'image/png', 'application/pdf'];
+            const allowedTypes = ['image/jpeg', 'image/png', 'image/tiff', 'image/webp', 'image/bmp', 'image/gif', 'application/pdf'];
             if (!allowedTypes.includes(file.type)) {
-                this.showError('Invalid file type. Please select JPEG, PNG, or PDF files only.');
+                this.showError('Invalid file type. Please select JPEG, PNG, TIFF, WebP, BMP, GIF or PDF files only.');
                 this.fileInput.value = '';
                 this.updateUploadZoneText();
                 return;
@@ -158,7 +162,8 @@ class OCRApp {
 
     populateLanguageSelect(languages) {
         // Clear existing options except English
-        this.languageSelect.innerHTML = '<option value="eng" selected>English</option>';
+        this.languageSelect.innerHTML = '<option value="eng" selected>English</option>' +
+            '<option value="auto">Detect automatically</option>';
 
         // Add other languages
         const languageNames = {
@@ -201,27 +206,90 @@ class OCRApp {
         formData.append('file', file);
         formData.append('language', this.languageSelect.value);
 
+        // Closing an earlier stream cancels its remaining pages on the server
+        if (this.streamController) {
+            this.streamController.abort();
+        }
+        const controller = new AbortController();
+        this.streamController = controller;
+
         try {
-            const response = await fetch('/upload', {
+            const response = await fetch('/upload/stream', {
                 method: 'POST',
-                body: formData
+                body: formData,
+                signal: controller.signal
             });
 
-            const data = await response.json();
-
-            if (data.success) {
-                this.showResults(data.text, data.filename);
-            } else {
+            // Errors before processing starts come back as plain JSON
+            if (!response.headers.get('Content-Type').startsWith('text/event-stream')) {
+                const data = await response.json();
                 this.showError(data.error || 'OCR processing failed');
+                return;
             }
+
+            const pages = [];
+            await this.readEvents(response, (event, data) => {
+                if (event === 'page') {
+                    // Show pages as they finish instead of waiting for the whole document
+                    if (data.text) {
+                        pages.push(data.pages_total > 1 ? `--- Page ${data.page} ---\n${data.text}` : data.text);
+                    }
+                    this.showResults(pages.join('\n\n'), file.name, pages.length === 1);
+                    this.updateProgress(data.pages_done, data.pages_total);
+                } else if (event === 'result') {
+                    this.showResults(data.text, data.filename, pages.length === 0);
+                } else if (event === 'error') {
+                    this.showError(data.error || 'OCR processing failed');
+                }
+            });
         } catch (error) {
+            if (error.name === 'AbortError') {
+                return;
+            }
             this.showError('Network error occurred. Please try again.');
             console.error('Upload error:', error);
         } finally {
-            this.hideProgress();
+            if (this.streamController === controller) {
+                this.streamController = null;
+                this.hideProgress();
+            }
         }
     }
 
+    async readEvents(response, onEvent) {
+        // Minimal Server-Sent Events parser over a fetch body (EventSource cannot POST)
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                const data = [];
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data.push(line.slice(6));
+                });
+                if (data.length) {
+                    onEvent(event, JSON.parse(data.join('\n')));
+                }
+            }
+        }
+    }
+
+    updateProgress(pagesDone, pagesTotal) {
+        this.progressBar.style.width = `${Math.round(100 * pagesDone / pagesTotal)}%`;
+        this.progressStatus.textContent = `Processed page ${pagesDone} of ${pagesTotal}`;
+    }
+
     showProgress() {
         this.progressContainer.style.display = 'block';
         this.uploadBtn.disabled = true;
@@ -230,11 +298,13 @@ class OCRApp {
 
     hideProgress() {
         this.progressContainer.style.display = 'none';
+        this.progressBar.style.width = '100%';
+        this.progressStatus.innerHTML = this.progressStatusHTML;
         this.uploadBtn.disabled = false;
         this.uploadBtn.innerHTML = '<i class="fas fa-magic me-2"></i>Extract Text';
     }
 
-    showResults(text, filename) {
+    showResults(text, filename, scroll = true) {
         this.currentText = text;
         this.currentFileName = filename;
         
@@ -243,7 +313,9 @@ class OCRApp {
         this.resultsContainer.style.display = 'block';
 
         // Scroll to results
-        this.resultsContainer.scrollIntoView({ behavior: 'smooth' });
+        if (scroll) {
+            this.resultsContainer.scrollIntoView({ behavior: 'smooth' });
+        }
     }
 
     hideResults() {
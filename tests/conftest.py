@@ -0,0 +1,84 @@
+"""
+Shared fixtures for the unit tests.
+
+Tesseract and Poppler are not needed: the `ocr_tools` fixture reports them
+as installed, and tests replace the pytesseract and pdf2image calls with
+autospecced fakes, so a call the pinned packages would reject still fails.
+"""
+
+import os
+import sys
+import subprocess
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytesseract
+import pdf2image
+from app import create_app
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing')
+    app.config.update(
+        UPLOAD_FOLDER=str(tmp_path),
+        POPPLER_PATH=None,
+        PDF_USE_TEXT_LAYER=False
+    )
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def ocr_tools(app):
+    """Report Tesseract and Poppler as installed and fake their OCR and rendering calls.
+
+    Returns:
+        SimpleNamespace: The autospecced image_to_string, pdfinfo_from_path and
+            convert_from_path mocks, and the argv of every Poppler tool run
+    """
+    registry = app.extensions['ocr_capabilities']
+    registry._snapshot = dict(
+        registry.get(),
+        engine='pytesseract',
+        tesseract={'available': True, 'version': '5.3.0'},
+        poppler={'available': True, 'version': '23.08.0'}
+    )
+
+    page_count = 5
+    poppler_calls = []
+
+    def fake_run_poppler(self, tool, args, poppler_path):
+        poppler_calls.append([tool] + args)
+        stdout = ''
+        if tool == 'pdfinfo':
+            first_page, last_page = int(args[args.index('-f') + 1]), int(args[args.index('-l') + 1])
+            stdout = ''.join(
+                f'Page {page:4d} size: 612 x 792 pts (letter)\n'
+                for page in range(first_page, min(last_page, page_count) + 1)
+            )
+        return subprocess.CompletedProcess([tool] + args, 0, stdout.encode(), b'')
+
+    def fake_convert(pdf_path, dpi=200, first_page=None, last_page=None, **kwargs):
+        return [Image.new('L', (int(8.5 * dpi / 10), int(11 * dpi / 10)), 255)]
+
+    tools = SimpleNamespace(
+        image_to_string=mock.create_autospec(pytesseract.image_to_string, return_value='page text'),
+        pdfinfo_from_path=mock.create_autospec(pdf2image.pdfinfo_from_path, return_value={'Pages': page_count}),
+        convert_from_path=mock.create_autospec(pdf2image.convert_from_path, side_effect=fake_convert),
+        poppler_calls=poppler_calls
+    )
+
+    with mock.patch.object(pytesseract, 'image_to_string', tools.image_to_string), \
+            mock.patch.object(pdf2image, 'pdfinfo_from_path', tools.pdfinfo_from_path), \
+            mock.patch.object(pdf2image, 'convert_from_path', tools.convert_from_path), \
+            mock.patch('app.ocr_processor.OCRProcessor._run_poppler', fake_run_poppler):
+        yield tools
+
+@pytest.fixture
+def processor(app):
+    from app.ocr_processor import OCRProcessor
+    return OCRProcessor()
@@ -0,0 +1,133 @@
+"""Admission control and the upload rate limit."""
+
+import io
+import threading
+import time
+from unittest import mock
+
+import pytest
+from PIL import Image
+
+from app.admission import AdmissionController, AdmissionError, RateLimiter, init_admission, parse_rate_limit
+
+def controller(max_requests=2, max_pages=10, max_waiting=1, wait_timeout=0.05):
+    return AdmissionController(max_requests, max_pages, max_waiting, wait_timeout, retry_after=5)
+
+@pytest.mark.parametrize('rate, expected', [
+    ('10 per minute', (10, 60)),
+    ('100/hour', (100, 3600)),
+    ('5 per 10 seconds', (5, 10)),
+    (' 1 PER DAY ', (1, 86400)),
+    (None, None),
+    ('', None)
+])
+def test_parse_rate_limit(rate, expected):
+    assert parse_rate_limit(rate) == expected
+
+def test_parse_rate_limit_rejects_nonsense():
+    with pytest.raises(ValueError):
+        parse_rate_limit('lots per fortnight')
+
+def test_rate_limiter_refills_over_time():
+    now = [100.0]
+    with mock.patch('app.admission.time.monotonic', lambda: now[0]):
+        limiter = RateLimiter(2, 60)
+        assert limiter.acquire('a') == 0
+        assert limiter.acquire('a') == 0
+        assert limiter.acquire('a') == pytest.approx(30)
+        assert limiter.acquire('b') == 0  # Clients have their own buckets
+
+        now[0] += 30
+        assert limiter.acquire('a') == 0
+        assert limiter.acquire('a') == pytest.approx(30)
+
+def test_admits_within_request_and_page_budgets():
+    admission = controller(max_requests=2, max_pages=10)
+
+    weights = [admission.acquire(4), admission.acquire(6)]
+
+    assert admission.stats() == {'requests_in_flight': 2, 'pages_in_flight': 10, 'waiting': 0}
+    for weight in weights:
+        admission.release(weight)
+    assert admission.stats()['pages_in_flight'] == 0
+
+def test_oversized_document_weighs_the_whole_budget():
+    admission = controller(max_pages=10)
+
+    assert admission.acquire(500) == 10
+
+def test_times_out_waiting_for_pages():
+    admission = controller(max_pages=10, wait_timeout=0.05)
+    admission.acquire(8)
+
+    with pytest.raises(AdmissionError) as error:
+        admission.acquire(5)
+    assert (error.value.status, error.value.retry_after) == (503, 5)
+    assert admission.stats()['waiting'] == 0
+
+def test_full_wait_queue_is_turned_away():
+    admission = controller(max_requests=1, max_waiting=0)
+    admission.acquire(1)
+
+    with pytest.raises(AdmissionError):
+        admission.acquire(1)
+
+def test_waiters_are_admitted_in_order():
+    admission = controller(max_requests=1, max_waiting=2, wait_timeout=5)
+    weight = admission.acquire(1)
+    admitted = []
+
+    def worker(name):
+        with admission.admit(1):
+            admitted.append(name)
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ('first', 'second')]
+    for thread in threads:
+        thread.start()
+        while admission.stats()['waiting'] < threads.index(thread) + 1:
+            time.sleep(0.001)
+    admission.release(weight)
+    for thread in threads:
+        thread.join()
+
+    assert admitted == ['first', 'second']
+
+def test_background_work_waits_past_the_timeout():
+    admission = controller(max_requests=1, max_waiting=0, wait_timeout=0.01)
+    weight = admission.acquire(1)
+    done = threading.Event()
+
+    def background():
+        with admission.admit(1, background=True):
+            done.set()
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    time.sleep(0.05)
+    assert not done.is_set()
+    admission.release(weight)
+    thread.join()
+    assert done.is_set()
+
+def test_upload_over_rate_limit_gets_429(app):
+    app.config['UPLOAD_RATE_LIMIT'] = '1 per minute'
+    init_admission(app)
+    client = app.test_client()
+
+    responses = [client.post('/upload', data={'file': (io.BytesIO(b'hello'), 'notes.txt')}) for _ in range(2)]
+
+    assert responses[0].status_code == 400  # Admitted, then rejected for its file type
+    assert responses[1].status_code == 429
+    assert int(responses[1].headers['Retry-After']) == 60
+
+def test_busy_server_gets_503(app):
+    app.config.update(MAX_CONCURRENT_UPLOADS=1, ADMISSION_QUEUE_DEPTH=0)
+    admission = init_admission(app)
+    admission.acquire(1)
+    upload = io.BytesIO()
+    Image.new('L', (50, 50), 255).save(upload, 'PNG')
+
+    response = app.test_client().post('/upload', data={'file': (io.BytesIO(upload.getvalue()), 'a.png')})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
@@ -0,0 +1,72 @@
+"""Result cache keys and backends."""
+
+import pytest
+
+from app.cache import MemoryCache, DiskCache
+
+def test_key_covers_file_language_and_options(processor):
+    keys = {
+        processor.get_cache_key('hash', 'eng', {}),
+        processor.get_cache_key('other', 'eng', {}),
+        processor.get_cache_key('hash', 'deu', {}),
+        processor.get_cache_key('hash', 'eng', {'first_page': 2}),
+        processor.get_cache_key('hash', 'eng', {'structured': True})
+    }
+    assert len(keys) == 5
+    assert processor.get_cache_key('hash', 'eng', {}) == processor.get_cache_key('hash', 'eng', {})
+
+@pytest.mark.parametrize('setting, value', [
+    ('OCR_ENGINE', 'tesserocr'),
+    ('IMAGE_MAX_PIXELS', 1_000_000),
+    ('PDF_DPI', 200),
+    ('PDF_TARGET_PIXELS', 4_000_000),
+    ('PDF_MIN_DPI', 100),
+    ('PDF_MAX_DPI', 600),
+    ('PDF_USE_TEXT_LAYER', True),
+    ('PDF_TEXT_LAYER_MIN_CHARS', 10),
+    ('OCR_PREPROCESS', True)
+])
+def test_key_changes_with_output_settings(app, processor, setting, value):
+    before = processor.get_cache_key('hash', 'eng', {})
+    app.config[setting] = value
+
+    assert processor.get_cache_key('hash', 'eng', {}) != before
+
+def test_key_changes_with_preprocess_settings(app, processor):
+    app.config['OCR_PREPROCESS'] = True
+    before = processor.get_cache_key('hash', 'eng', {})
+    app.config['PREPROCESS_TARGET_TEXT_HEIGHT'] = 40
+
+    assert processor.get_cache_key('hash', 'eng', {}) != before
+
+def test_key_separates_mock_and_real_ocr(processor, ocr_tools, app):
+    real = processor.get_cache_key('hash', 'eng', {})
+    app.extensions['ocr_capabilities']._snapshot['tesseract'] = {'available': False, 'version': None}
+
+    assert processor.get_cache_key('hash', 'eng', {}) != real
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_bytes=40, ttl=60)
+    cache.set('a', {'text': 'aaaa'})
+    cache.set('b', {'text': 'bbbb'})
+    cache.get('a')
+    cache.set('c', {'text': 'cccc'})
+
+    assert cache.get('a') == {'text': 'aaaa'}
+    assert cache.get('b') is None
+    assert cache.get('c') == {'text': 'cccc'}
+
+def test_disk_cache_replacing_an_entry_keeps_its_size(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1024, ttl=60)
+    for _ in range(5):
+        cache.set('a', {'text': 'x' * 100})
+
+    assert cache.stats()['bytes'] == len('{"text": "' + 'x' * 100 + '"}')
+    assert cache.get('a') == {'text': 'x' * 100}
+
+def test_disk_cache_expires_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1024, ttl=-1)
+    cache.set('a', {'text': 'old'})
+
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] == 0
@@ -0,0 +1,109 @@
+"""Page and document time limits, and the partial results they leave."""
+
+import io
+import time
+import threading
+from concurrent.futures import Future
+
+import pdf2image
+import pytest
+
+from app.ocr_processor import _Deadline
+
+PDF_BYTES = b'%PDF-1.4\n%%EOF\n'
+
+@pytest.fixture(autouse=True)
+def one_page_worker(app):
+    # Pages are OCR'd in page order, so fakes can fail a given page
+    app.config['OCR_PAGE_WORKERS'] = 1
+
+def fail_call(number, error):
+    """side_effect that raises error on the given call and returns 'page text' otherwise."""
+    calls = []
+
+    def side_effect(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == number:
+            raise error
+        return 'page text'
+    return side_effect
+
+def test_page_timeout_is_partial(processor, ocr_tools):
+    ocr_tools.image_to_string.side_effect = fail_call(2, RuntimeError('Tesseract process timeout'))
+
+    result = processor.process_file('scan.pdf', data=PDF_BYTES, first_page=1, last_page=3)
+
+    assert result['success']
+    assert result['partial']
+    assert result['failed_pages'] == [2]
+    assert result['pages_processed'] == 2
+    assert '--- Page 2 ---' not in result['text']
+
+def test_page_timeout_is_passed_to_tesseract(app, processor, ocr_tools):
+    app.config['OCR_TIMEOUT'] = 7
+
+    processor.process_file('scan.pdf', data=PDF_BYTES, first_page=1, last_page=1)
+
+    assert ocr_tools.image_to_string.call_args.kwargs['timeout'] == pytest.approx(7)
+
+def test_render_timeout_fails_the_page(app, processor, ocr_tools):
+    app.config['OCR_TIMEOUT'] = 7
+    render = ocr_tools.convert_from_path.side_effect
+
+    def hang_on_page_3(pdf_path, **kwargs):
+        if kwargs['first_page'] == 3:
+            raise pdf2image.exceptions.PDFPopplerTimeoutError('Run poppler poppler timeout.')
+        return render(pdf_path, **kwargs)
+    ocr_tools.convert_from_path.side_effect = hang_on_page_3
+
+    result = processor.process_file('scan.pdf', data=PDF_BYTES)
+
+    assert result['success']
+    assert result['failed_pages'] == [3]
+    assert result['pages_processed'] == 4
+    assert ocr_tools.convert_from_path.call_args.kwargs['timeout'] == pytest.approx(7)
+    assert ocr_tools.pdfinfo_from_path.call_args.kwargs['timeout'] == pytest.approx(7)
+
+def test_document_deadline_returns_pages_so_far(app, processor, ocr_tools):
+    app.config['OCR_DOCUMENT_TIMEOUT'] = 0.3
+
+    def slow_ocr(*args, **kwargs):
+        time.sleep(0.2)
+        return 'page text'
+    ocr_tools.image_to_string.side_effect = slow_ocr
+
+    result = processor.process_file('scan.pdf', data=PDF_BYTES)
+
+    assert result['success']
+    assert result['partial']
+    assert 0 < result['pages_processed'] < 5
+
+def test_cancelled_document(processor, ocr_tools):
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    result = processor.process_file('scan.pdf', data=PDF_BYTES, cancel_event=cancel_event)
+
+    assert not result['success']
+    assert result['cancelled']
+
+def test_waiting_for_a_page_times_out(processor):
+    # concurrent.futures.TimeoutError is only the builtin TimeoutError from Python 3.11
+    future = Future()
+
+    page_number, text, timings = processor._collect_page(4, future, deadline=_Deadline(0.01, 0))
+
+    assert (page_number, text, timings) == (4, None, {})
+    assert future.cancelled()
+
+def test_partial_results_are_not_cached(app, ocr_tools):
+    ocr_tools.image_to_string.side_effect = fail_call(2, RuntimeError('Tesseract process timeout'))
+    client = app.test_client()
+
+    responses = [
+        client.post('/upload', data={'file': (io.BytesIO(PDF_BYTES), 'scan.pdf')}).get_json()
+        for _ in range(2)
+    ]
+
+    assert responses[0]['partial'] and responses[0]['failed_pages'] == [2]
+    assert not responses[1]['cached']
@@ -0,0 +1,58 @@
+"""OCR engine command lines against the pinned pytesseract."""
+
+import io
+from unittest import mock
+
+from PIL import Image
+import pytesseract
+
+from app.engines import PytesseractEngine
+
+class FakeTesseract:
+    """Stands in for the tesseract process, writing one output file per renderer argument."""
+
+    calls = []
+
+    def __init__(self, args, **kwargs):
+        self.calls.append(list(args))
+        self.returncode = 0
+        self.stdin = self.stdout = self.stderr = mock.Mock()
+        output_base = args[2]
+        for renderer in ('txt', 'pdf'):
+            if renderer in args[3:]:
+                with open(f'{output_base}.{renderer}', 'w', encoding='utf-8') as f:
+                    f.write(f'{renderer} output')
+
+    def communicate(self, timeout=None):
+        return b'', b''
+
+def test_searchable_pdf_runs_text_and_pdf_renderers(tmp_path):
+    FakeTesseract.calls.clear()
+    image = Image.new('L', (200, 100), 255)
+    pdf_path = tmp_path / 'page.pdf'
+
+    with mock.patch.object(pytesseract.pytesseract.subprocess, 'Popen', FakeTesseract):
+        text = PytesseractEngine().image_to_string_and_pdf(image, 'eng', '--oem 3 --psm 6', str(pdf_path))
+
+    assert text == 'txt output'
+    assert pdf_path.read_text() == 'pdf output'
+    assert FakeTesseract.calls[0][-2:] == ['txt', 'pdf']
+
+def ocr_config(ocr_tools):
+    return ocr_tools.image_to_string.call_args.kwargs['config']
+
+def test_uploaded_image_dpi_metadata_is_ignored(processor, ocr_tools):
+    upload = io.BytesIO()
+    Image.new('RGB', (400, 200), 'white').save(upload, 'JPEG', dpi=(72, 72))
+
+    result = processor.process_file('photo.jpg', data=upload.getvalue())
+
+    assert result['success'], result['error']
+    assert '--dpi' not in ocr_config(ocr_tools)
+
+def test_rasterized_pdf_page_passes_its_dpi(app, processor, ocr_tools):
+    app.config.update(PDF_TARGET_PIXELS=8_415_000, PDF_MIN_DPI=100, PDF_MAX_DPI=400)
+
+    processor.process_file('scan.pdf', data=b'%PDF-1.4\n%%EOF\n', first_page=1, last_page=1)
+
+    assert ocr_config(ocr_tools).endswith('--dpi 300')
@@ -0,0 +1,60 @@
+"""Job stores and the job queue."""
+
+import sqlite3
+from unittest import mock
+
+import pytest
+
+from app.jobs import MemoryJobStore, SqliteJobStore, JobQueue
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SqliteJobStore(str(tmp_path / 'jobs.db'))
+    return MemoryJobStore()
+
+def test_store_round_trip(store):
+    store.create({'id': 'a', 'status': 'queued', 'filename': 'scan.pdf', 'updated_at': 0})
+    store.update('a', status='finished', result={'text': 'hello', 'fields': {'total': '12'}})
+
+    job = store.get('a')
+    assert job['status'] == 'finished'
+    assert job['result'] == {'text': 'hello', 'fields': {'total': '12'}}
+    assert store.get('missing') is None
+
+def test_store_purges_finished_jobs(store):
+    store.create({'id': 'a', 'status': 'queued', 'updated_at': 0})
+    store.create({'id': 'b', 'status': 'queued', 'updated_at': 0})
+    store.update('a', status='finished')
+
+    store.purge(older_than=float('inf'))
+
+    assert store.get('a') is None
+    assert store.get('b') is not None
+
+def test_sqlite_store_closes_its_connections(tmp_path):
+    connections = []
+    real_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        connections.append(real_connect(*args, **kwargs))
+        return connections[-1]
+
+    with mock.patch('app.jobs.sqlite3.connect', connect):
+        store = SqliteJobStore(str(tmp_path / 'jobs.db'))
+        store.create({'id': 'a', 'status': 'queued', 'updated_at': 0})
+        store.update('a', status='running')
+        store.get('a')
+        store.purge(0)
+
+    assert len(connections) == 5
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
+def test_cached_job_reports_its_pages(app, store):
+    queue = JobQueue(app, store, workers=1, max_depth=1)
+
+    job = store.get(queue.create_finished('scan.pdf', 'eng', {'text': '...', 'pages_processed': 7, 'total_pages': 9}))
+
+    assert (job['status'], job['pages_done'], job['pages_total']) == ('finished', 7, 7)
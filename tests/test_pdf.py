@@ -0,0 +1,103 @@
+"""PDF page ranges, chunking and searchable PDFs against the pinned pdf2image API."""
+
+from unittest import mock
+
+from app.engines import PytesseractEngine
+from app.zones import parse_template
+
+PDF_BYTES = b'%PDF-1.4\n%%EOF\n'
+
+def rendered_pages(ocr_tools):
+    return [call.kwargs['first_page'] for call in ocr_tools.convert_from_path.call_args_list]
+
+def test_page_range(processor, ocr_tools):
+    result = processor.process_file('scan.pdf', data=PDF_BYTES, first_page=2, last_page=4)
+
+    assert result['success'], result['error']
+    assert result['pages_processed'] == 3
+    assert result['total_pages'] == 5
+    assert rendered_pages(ocr_tools) == [2, 3, 4]
+    assert ['pdfinfo', '-f', '2', '-l', '4'] == ocr_tools.poppler_calls[0][:5]
+
+def test_page_range_clamped_to_document(processor, ocr_tools):
+    result = processor.process_file('scan.pdf', data=PDF_BYTES, first_page=4, last_page=50)
+
+    assert result['success'], result['error']
+    assert result['pages_processed'] == 2
+    assert rendered_pages(ocr_tools) == [4, 5]
+
+def test_page_range_after_last_page(processor, ocr_tools):
+    result = processor.process_file('scan.pdf', data=PDF_BYTES, first_page=6)
+
+    assert not result['success']
+    assert 'document has 5 pages' in result['error']
+
+def test_chunks_probe_their_own_page_sizes(app, processor, ocr_tools):
+    app.config['PDF_CHUNK_PAGES'] = 2
+
+    result = processor.process_file('scan.pdf', data=PDF_BYTES)
+
+    assert result['pages_processed'] == 5
+    probes = [call[1:5] for call in ocr_tools.poppler_calls if call[0] == 'pdfinfo']
+    assert probes == [['-f', '1', '-l', '2'], ['-f', '3', '-l', '4'], ['-f', '5', '-l', '5']]
+
+def test_page_size_sets_render_dpi(app, processor, ocr_tools):
+    app.config.update(PDF_TARGET_PIXELS=8_415_000, PDF_MIN_DPI=100, PDF_MAX_DPI=400)
+
+    processor.process_file('scan.pdf', data=PDF_BYTES, first_page=1, last_page=1)
+
+    # Letter at 300 DPI is 2550 x 3300 = 8,415,000 pixels
+    assert ocr_tools.convert_from_path.call_args.kwargs['dpi'] == 300
+
+def test_template_pages(processor, ocr_tools):
+    template = parse_template('form', {
+        'zones': {
+            'number': {'box': [0.5, 0.0, 1.0, 0.1], 'page': 2},
+            'total': {'box': [0.5, 0.9, 1.0, 1.0], 'page': 9}
+        }
+    })
+
+    result = processor.process_file('form.pdf', data=PDF_BYTES, template=template)
+
+    assert result['success'], result['error']
+    assert result['fields']['number'] == 'page text'
+    assert result['fields']['total'] == ''
+    assert rendered_pages(ocr_tools) == [2]
+
+def fake_page_pdfs(fail_page=None, write=True):
+    """Stand-in for image_to_string_and_pdf that writes a page PDF unless told not to."""
+    def image_to_string_and_pdf(self, image, language, config, pdf_path, timeout=0):
+        if pdf_path.endswith(f'page_{fail_page or 0:06d}.pdf'):
+            raise RuntimeError('Tesseract process timeout')
+        if write:
+            with open(pdf_path, 'wb') as f:
+                f.write(PDF_BYTES)
+        return 'page text'
+    return mock.patch.object(PytesseractEngine, 'image_to_string_and_pdf', image_to_string_and_pdf)
+
+def test_searchable_pdf_joins_page_pdfs(processor, ocr_tools, tmp_path):
+    with fake_page_pdfs():
+        result = processor.process_file('scan.pdf', data=PDF_BYTES, last_page=3,
+                                        searchable_pdf=str(tmp_path / 'out.pdf'))
+
+    assert result['success'], result['error']
+    tools = [call[0] for call in ocr_tools.poppler_calls]
+    assert 'pdfseparate' not in tools
+    assert ocr_tools.poppler_calls[-1][0] == 'pdfunite' and len(ocr_tools.poppler_calls[-1]) == 5
+
+def test_searchable_pdf_missing_page_pdf_fails(processor, ocr_tools, tmp_path):
+    with fake_page_pdfs(write=False):
+        result = processor.process_file('scan.pdf', data=PDF_BYTES, last_page=3,
+                                        searchable_pdf=str(tmp_path / 'out.pdf'))
+
+    assert not result['success']
+    assert 'no searchable PDF for page 1' in result['error']
+
+def test_searchable_pdf_failed_page_is_partial(processor, ocr_tools, tmp_path):
+    with fake_page_pdfs(fail_page=2):
+        result = processor.process_file('scan.pdf', data=PDF_BYTES, last_page=3,
+                                        searchable_pdf=str(tmp_path / 'out.pdf'))
+
+    assert result['success'], result['error']
+    assert result['partial'] and result['failed_pages'] == [2]
+    assert ['pdfseparate', '-f', '2', '-l', '2'] in [call[:5] for call in ocr_tools.poppler_calls]